@@ -1,11 +1,68 @@
 """Entry point for API."""
 
-from fastapi import FastAPI
+import hashlib
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import income, expenses, summary, export
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from api.routes import (
+    categories,
+    income,
+    expenses,
+    summary,
+    export,
+    metrics,
+    plot,
+    stats,
+    transactions,
+)
+from db.async_db import shutdown_executor
+from db.config import get_config
+from db.db import (
+    close_pool,
+    close_writer,
+    create_transactions_table,
+    get_data_version,
+    get_writer,
+)
+from db.metrics import get_metrics
+from db.pool import PoolTimeoutError
+
+# GET routes whose responses don't depend only on the stored data, and so
+# can't be validated against the data version.
+ETAG_EXCLUDED_PATHS = {"/stats/", "/metrics"}
+# The route label of requests that match no route, so that stray paths
+# don't each get their own latency histogram.
+UNMATCHED_ROUTE = "unmatched"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates or migrates the database schema before serving, and releases the
+    database threads and connections when the app shuts down.
+    """
+    create_transactions_table()
+    # Read once, so that no request re-reads the configuration to find out.
+    app.state.metrics = get_config()["metrics"]
+    # Started now, rather than by the first request that needs the data
+    # version (see compute_etag), so that no request waits for it.
+    get_writer().start()
+    yield
+    plot.shutdown_render_pool()
+    shutdown_executor()
+    close_writer()
+    close_pool()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,10 +76,121 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def compute_etag(request: Request) -> str:
+    """
+    Returns the ETag of a GET request's response: a hash of the data
+    version, the path and the (sorted) query parameters. The version is read
+    on a worker thread, as it may re-read the configuration or start the
+    writer and wait for it, and not on the database threads, so that a 304
+    never waits behind a slow query.
+    """
+    query = sorted(request.query_params.multi_items())
+    version = await run_in_threadpool(get_data_version)
+    key = f"{version}|{request.url.path}|{query}"
+    return '"' + hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weakly, as for GET)."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@app.middleware("http")
+async def conditional_get(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """
+    Adds an ETag to successful GET responses and answers a request whose
+    If-None-Match matches with 304 Not Modified, before the route runs, so
+    unchanged data is neither queried nor serialized again.
+    """
+    if request.method != "GET" or request.url.path in ETAG_EXCLUDED_PATHS:
+        return await call_next(request)
+    # Taken before the route reads anything, so the response is at least as
+    # new as the version the ETag stands for.
+    etag = await compute_etag(request)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+
+def route_template(request: Request) -> str:
+    """
+    Returns the path template of the route a request was (or would have
+    been) handled by, such as /expenses/, or UNMATCHED_ROUTE.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        # Not routed, as when answered with 304 before the route ran.
+        route = next(
+            (r for r in app.router.routes if r.matches(request.scope)[0] == Match.FULL),
+            None,
+        )
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+@app.middleware("http")
+async def record_request_metrics(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """
+    Records the time each request takes until its response starts, by
+    method, route and status, if metrics were enabled when the app started.
+    """
+    if not request.app.state.metrics:
+        return await call_next(request)
+    start = time.perf_counter()
+    response = await call_next(request)
+    get_metrics().observe_request(
+        request.method,
+        route_template(request),
+        response.status_code,
+        time.perf_counter() - start,
+    )
+    return response
+
+
+@app.exception_handler(RequestValidationError)
+async def request_validation_error(
+    _: Request, exc: RequestValidationError
+) -> JSONResponse:
+    """
+    Answers invalid requests with 422 as FastAPI does, but writes
+    non-finite numbers in the echoed input (such as an amount of Infinity)
+    as strings, since JSON can't represent them.
+    """
+    detail = jsonable_encoder(
+        exc.errors(),
+        custom_encoder={float: lambda x: x if math.isfinite(x) else str(x)},
+    )
+    return JSONResponse(status_code=422, content={"detail": detail})
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout(_: Request, exc: PoolTimeoutError) -> JSONResponse:
+    """Answers with 503 when every database connection is busy."""
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
 app.include_router(income.router)
 app.include_router(expenses.router)
 app.include_router(summary.router)
 app.include_router(export.router)
+app.include_router(transactions.router)
+app.include_router(categories.router)
+app.include_router(stats.router)
+app.include_router(plot.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
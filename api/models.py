@@ -1,7 +1,10 @@
 from datetime import date
+from typing import Optional, Tuple
 
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+
+from cli.models import TransactionRecord, TransactionRow, from_cents, to_cents
 
 
 class TransactionBase(BaseModel):
@@ -11,12 +14,66 @@ class TransactionBase(BaseModel):
     amount: float
     type: str = "income"
 
+    @field_validator("amount")
+    @classmethod
+    def check_amount(cls, amount: float) -> float:
+        """Rejects amounts that can't be stored in cents."""
+        to_cents(amount)
+        return amount
+
+    def to_row(self) -> Tuple[str, str, str, int, str]:
+        """
+        Returns the (date, description, category, amount, type) values to
+        store, with the amount in cents.
+        """
+        return (
+            self.date.isoformat(),
+            self.description,
+            self.category,
+            to_cents(self.amount),
+            self.type,
+        )
+
 
 class TransactionResponse(TransactionBase):
     id: int
 
+    @classmethod
+    def from_row(cls, row: TransactionRow) -> "TransactionResponse":
+        """
+        Builds a transaction from a stored (id, date, description, category,
+        amount, type) row, with the amount in cents.
+        """
+        transaction_id, transaction_date, description, category, amount, type = row
+        return cls(
+            id=transaction_id,
+            date=transaction_date,
+            description=description,
+            category=category,
+            amount=from_cents(amount),
+            type=type,
+        )
+
 
 class SummaryResponse(BaseModel):
     total_income: float
     total_expenses: float
     net_balance: float
+    income_by_category: dict[str, float] = {}
+    expenses_by_category: dict[str, float] = {}
+
+
+class CategoryResponse(BaseModel):
+    id: int
+    name: str
+    count: int
+
+
+class BatchError(BaseModel):
+    index: Optional[int] = None
+    error: str
+
+
+class BatchResponse(BaseModel):
+    ids: list[Optional[int]]
+    errors: list[BatchError] = []
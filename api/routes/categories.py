@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from api.models import CategoryResponse
+from db import async_db
+
+
+router = APIRouter()
+
+
+@router.get("/categories/", response_model=list[CategoryResponse])
+async def get_categories():
+    """Get all categories with their number of transactions."""
+
+    categories = await async_db.get_categories()
+    return [
+        CategoryResponse(id=category_id, name=name, count=count)
+        for category_id, name, count in categories
+    ]
@@ -1,8 +1,9 @@
 from typing import Optional
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Response
 
 from api.models import TransactionResponse, TransactionBase
-from db.db import add_transaction, get_transactions
+from db import async_db
+from db.db import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from utils.util import get_start_end_date_from_month
 
 
@@ -14,17 +15,40 @@ async def add_expense(transaction: TransactionBase):
     """Add new expense transaction."""
 
     transaction.type = "expense"
-    return add_transaction(transaction)
+    return await async_db.add_transaction(transaction)
 
 
 @router.get("/expenses/", response_model=list[TransactionResponse])
-async def get_expenses(date: Optional[str] = None, category: Optional[str] = None):
-    """Get all expenses (optionally filtered by month and category)."""
+async def get_expenses(
+    date: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+):
+    """
+    Get all expenses (optionally filtered by month and category). With
+    limit, returns one page and sets the X-Next-Cursor header to pass as
+    after for the next one.
+    """
 
     start_date: Optional[str] = None
     end_date: Optional[str] = None
     if date:
         start_date, end_date = get_start_end_date_from_month(date)
-    return get_transactions(
-        start_date=start_date, end_date=end_date, category=category, type="expense"
-    )
+    if limit is None and after is not None:
+        limit = DEFAULT_PAGE_SIZE
+    try:
+        # Written straight from the JSON SQLite builds for each row, rather
+        # than through pydantic models and the response_model.
+        content, next_cursor = await async_db.get_transactions_json(
+            start_date=start_date,
+            end_date=end_date,
+            category=category,
+            type="expense",
+            limit=limit,
+            after=after,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(content, media_type="application/json", headers=headers)
@@ -1,16 +1,26 @@
-import csv
-from io import StringIO
-from typing import Optional
-from fastapi import APIRouter, Response
+import zlib
+from typing import Iterable, Iterator, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
-from api.models import TransactionResponse
-from cli.commands import CSV_FILENAME
-from db.db import get_transactions
+from db import async_db
+from db.db import iter_transactions
+from utils.util import CSV_FILENAME, iter_csv
 
 
 router = APIRouter()
 
 
+def _gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Compresses a stream of text chunks into a single gzip stream."""
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
 @router.get("/export/csv/")
 async def export_csv(
     start_date: Optional[str] = None,
@@ -19,28 +29,35 @@ async def export_csv(
     filename: Optional[str] = None,
     order_by: Optional[str] = None,
     order_direction: Optional[str] = None,
+    gzip: bool = False,
 ):
-    start_date = start_date
-    end_date = end_date
-    category = category
-    filename = filename
-    order_by = order_by
-    order_direction = order_direction
-
-    transactions = get_transactions(
-        start_date, end_date, category, order_by, order_direction
-    )
+    """
+    Stream transactions as CSV (optionally gzip-compressed), reading them
+    from the database in chunks so memory use does not grow with the export.
+    """
+
+    # Check the filters and run the query before any of the response is sent.
+    try:
+        transactions = await async_db.run(
+            iter_transactions,
+            start_date,
+            end_date,
+            category,
+            order_by,
+            order_direction,
+            stream=True,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     filename = filename or CSV_FILENAME
 
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(TransactionResponse.model_fields.keys())
-
-    for transaction in transactions:
-        writer.writerow(transaction.model_dump().values())
+    headers = {"Content-Disposition": f"attachment;filename={filename}"}
+    content: Iterator[str] | Iterator[bytes] = iter_csv(transactions)
+    if gzip:
+        content = _gzip_chunks(content)
+        headers["Content-Encoding"] = "gzip"
 
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment;filename={filename}"},
+    # Each chunk is read, formatted and compressed on the database threads.
+    return StreamingResponse(
+        async_db.iterate(content), media_type="text/csv", headers=headers
     )
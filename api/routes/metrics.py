@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from db import db
+from db.metrics import get_metrics
+
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+# A plain def, so that get_stats, which takes the pool, writer and cache locks
+# (and may create the pool or writer), runs on a worker thread.
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_prometheus_metrics(request: Request):
+    """
+    Get the query timings, request latencies and the result cache, writer and
+    connection pool statistics in the Prometheus text format.
+    """
+
+    if not request.app.state.metrics:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(
+        get_metrics().render(db.get_stats()), media_type=PROMETHEUS_CONTENT_TYPE
+    )
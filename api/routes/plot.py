@@ -0,0 +1,87 @@
+"""
+Holds the chart routes.
+
+Charts are rendered by matplotlib in a pool of worker processes, so that
+rendering never blocks the event loop or holds the GIL in the API process.
+Rendered images are cached by filter and data version, so a chart is only
+rendered again once the data has changed.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from db import async_db
+from db.db import get_data_version
+from utils.charts import CHART_FORMATS, expenses_chart_title, render_category_chart
+
+RENDER_WORKERS = 2
+CHART_CACHE_SIZE = 32
+
+router = APIRouter()
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+# (month, format, data version) -> image, least recently used first.
+_charts: OrderedDict[Tuple[Optional[str], str, str], bytes] = OrderedDict()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Returns the process pool that charts are rendered in."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # Spawned rather than forked, as the API process runs threads.
+            _render_pool = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    """Waits for running renders and stops the worker processes."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=True)
+            _render_pool = None
+    _charts.clear()
+
+
+@router.get("/plot/expenses")
+async def plot_expenses(
+    date: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
+    image_format: str = Query("png", alias="format", pattern="^(png|svg)$"),
+):
+    """
+    Get a bar chart of expenses by category (optionally filtered by month,
+    YYYY-MM) as a PNG or SVG image.
+    """
+
+    # Taken before reading, so a cached chart is never older than its version.
+    key = (date, image_format, await async_db.run(get_data_version))
+    image = _charts.get(key)
+    if image is None:
+        expenses_by_category = await async_db.get_expense_totals(date)
+        if not expenses_by_category:
+            raise HTTPException(
+                status_code=404, detail="No expenses found for the specified period."
+            )
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(
+            get_render_pool(),
+            render_category_chart,
+            expenses_by_category,
+            expenses_chart_title(date),
+            image_format,
+        )
+        _charts[key] = image
+        while len(_charts) > CHART_CACHE_SIZE:
+            _charts.popitem(last=False)
+    _charts.move_to_end(key)
+    return Response(image, media_type=CHART_FORMATS[image_format])
@@ -0,0 +1,15 @@
+from typing import Any
+from fastapi import APIRouter
+from db import db
+
+
+router = APIRouter()
+
+
+# A plain def, so that get_stats, which takes the pool, writer and cache locks
+# (and may create the pool or writer), runs on a worker thread.
+@router.get("/stats/")
+def get_stats() -> dict[str, Any]:
+    """Get the result cache hit/miss/eviction counters and the writer statistics."""
+
+    return db.get_stats()
@@ -1,7 +1,7 @@
 from typing import Optional
 from fastapi import APIRouter
 from api.models import SummaryResponse
-from db import db
+from db import async_db
 
 
 router = APIRouter()
@@ -11,5 +11,5 @@ router = APIRouter()
 async def get_summary(date: Optional[str] = None):
     """Get the total income, total expenses, and net balance (optionally filtered by month)."""
 
-    summary_data = db.get_summary(date)
+    summary_data = await async_db.get_summary(date)
     return SummaryResponse(**summary_data)
@@ -0,0 +1,72 @@
+from typing import Any, Literal, Optional
+from fastapi import APIRouter, Body, HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+from api.models import BatchError, BatchResponse, TransactionBase
+from db import async_db
+from db.db import get_config
+
+
+router = APIRouter()
+
+_transactions_adapter = TypeAdapter(list[TransactionBase])
+
+
+@router.post("/transactions/batch", response_model=BatchResponse, status_code=201)
+async def add_transactions_batch(
+    transactions: list[dict[str, Any]] = Body(...),
+    mode: Literal["atomic", "partial"] = "atomic",
+):
+    """
+    Add many income and expense transactions in one database transaction.
+
+    In atomic mode the whole batch is validated up front and either every
+    transaction is added or none are. In partial mode invalid or rejected
+    transactions are reported by index in errors and the rest are added.
+    """
+
+    max_batch_size = get_config()["max_batch_size"]
+    if len(transactions) > max_batch_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(transactions)} exceeds the limit of {max_batch_size}.",
+        )
+
+    if mode == "atomic":
+        try:
+            validated = _transactions_adapter.validate_python(transactions)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+        ids, errors = await async_db.add_transactions(validated, atomic=True)
+        if errors:
+            raise HTTPException(status_code=400, detail=errors[0][1])
+        return BatchResponse(ids=ids)
+
+    valid: list[TransactionBase] = []
+    valid_indexes: list[int] = []
+    batch_errors: list[BatchError] = []
+    for index, transaction in enumerate(transactions):
+        try:
+            valid.append(TransactionBase.model_validate(transaction))
+            valid_indexes.append(index)
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )
+            batch_errors.append(BatchError(index=index, error=message))
+
+    ids: list[Optional[int]] = [None] * len(transactions)
+    inserted_ids, errors = await async_db.add_transactions(valid, atomic=False)
+    for valid_index, transaction_id in enumerate(inserted_ids):
+        ids[valid_indexes[valid_index]] = transaction_id
+    for valid_index, error in errors:
+        batch_errors.append(
+            BatchError(
+                index=valid_indexes[valid_index] if valid_index is not None else None,
+                error=error,
+            )
+        )
+    batch_errors.sort(key=lambda batch_error: batch_error.index or 0)
+    return BatchResponse(ids=ids, errors=batch_errors)
@@ -0,0 +1,68 @@
+"""
+Benchmark of the memory used to hold a full transaction history: as
+pydantic models from get_transactions, as row tuples from
+get_transactions_by_filters and as a columnar TransactionBatch.
+
+Run with `python -m benchmarks.batch_memory`.
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from benchmarks.common import generate_rows, scratch_database
+from cli.models import from_cents
+from db import db
+
+
+def measure(load: Callable[[], Any]) -> tuple[Any, int, float]:
+    """Returns what load returned, the bytes it holds on to and the seconds it took."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main() -> None:
+    """Loads a scratch database and compares the size of each representation."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with scratch_database():
+        db.import_transactions(generate_rows(args.rows))
+        # Warm up the pool so its connection isn't counted against the first.
+        db.get_transaction(1)
+
+        loaders: dict[str, Callable[[], Any]] = {
+            "models": db.get_transactions,
+            "tuples": db.get_transactions_by_filters,
+            "batch": lambda: db.get_transaction_batch()[0],
+        }
+        results = {}
+        print(f"{args.rows:,} rows")
+        for name, load in loaders.items():
+            results[name], size, elapsed = measure(load)
+            print(
+                f"{name:>7}: {size / 2**20:8.1f} MiB "
+                f"({size / args.rows:6.1f} bytes/row), loaded in {elapsed:.2f}s"
+            )
+            if name != "batch":
+                del results[name]
+
+        batch = results["batch"]
+        expenses = batch.filter(type="expense")
+        summary = db.get_summary()
+        if from_cents(expenses.total()) != summary["total_expenses"] or {
+            category: from_cents(total)
+            for category, total in expenses.totals_by_category().items()
+        } != summary["expenses_by_category"]:
+            raise SystemExit("The batch totals don't match the summary.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark of the CLI's cold start: runs common commands in new interpreters
+with `-X importtime` against a scratch database, and reports the time each
+spends importing modules along with its wall time.
+
+Run with `python -m benchmarks.cli_startup`. Exits with a nonzero status if
+a command's import time goes over the budget or it imports a module that
+only other commands need.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from benchmarks.common import generate_rows, scratch_database
+from db import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMANDS: List[List[str]] = [
+    ["--help"],
+    ["get-transaction", "1"],
+    ["get-transactions", "-l", "20"],
+    ["view-summary", "-y", "2020"],
+    ["list-categories"],
+]
+# Only the API, and the commands that add, edit or plot, need these.
+HEAVY_MODULES = ("fastapi", "matplotlib", "numpy", "pydantic")
+DEFAULT_BUDGET_MS = 150.0
+
+
+def run_command(command: List[str], cwd: str) -> Tuple[float, float, List[str]]:
+    """
+    Runs a CLI command with -X importtime and returns its total import time
+    and wall time in milliseconds, and the top-level packages it imported.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "cli.main", *command],
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    import_us = 0
+    packages: List[str] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented, and counted in their parent's time.
+        if not name.startswith("  "):
+            import_us += int(cumulative)
+        packages.append(name.strip().split(".")[0])
+    return import_us / 1000, wall_ms, sorted(set(packages))
+
+
+def main() -> int:
+    """Times the commands and returns the process exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--rows", type=int, default=10_000)
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Best of")
+    parser.add_argument(
+        "-b",
+        "--budget",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help="Import time allowed per command, in milliseconds",
+    )
+    args = parser.parse_args()
+
+    failures: list[str] = []
+    with scratch_database() as database_path:
+        db.import_transactions(generate_rows(args.rows))
+        cwd = os.path.dirname(database_path)
+        print(f"{'Command':<32} {'Imports':>9} {'Wall':>9}")
+        for command in COMMANDS:
+            # The first run also writes the bytecode caches.
+            run_command(command, cwd)
+            runs = [run_command(command, cwd) for _ in range(args.repeat)]
+            import_ms = min(run[0] for run in runs)
+            wall_ms = min(run[1] for run in runs)
+            name = " ".join(command)
+            print(f"{name:<32} {import_ms:>7.1f}ms {wall_ms:>7.1f}ms")
+            if import_ms > args.budget:
+                failures.append(
+                    f"{name}: imports took {import_ms:.1f}ms, "
+                    f"over the {args.budget:.0f}ms budget"
+                )
+            heavy = [package for package in runs[0][2] if package in HEAVY_MODULES]
+            if heavy:
+                failures.append(f"{name}: imported {', '.join(heavy)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print(f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Holds helpers shared by the benchmark scripts."""
+
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Any, Iterator, Tuple
+
+from db import db
+from db.config import save_config
+
+CATEGORIES = ("Groceries", "Rent", "Utilities", "Dining", "Travel", "Salary", "Misc")
+# Like a real ledger, descriptions repeat (the same payees month after month).
+DESCRIPTION_COUNT = 1000
+
+
+@contextmanager
+def scratch_database(**config: Any) -> Iterator[str]:
+    """
+    Points the database functions at a new database in a temporary
+    directory, with any extra configuration given, and yields its path. The
+    writer and pool are closed and the directory removed afterwards.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            database_path = os.path.join(directory, "benchmark.db")
+            save_config({"db_path": database_path, **config})
+            if not db.create_transactions_table():
+                raise RuntimeError("Could not create the transactions table.")
+            yield database_path
+        finally:
+            db.close_writer()
+            db.close_pool()
+            os.chdir(cwd)
+
+
+def generate_rows(count: int, seed: int = 0) -> Iterator[Tuple[Any, ...]]:
+    """
+    Yields random (date, description, category, amount, type) rows, with the
+    amount in cents, as import_transactions takes them.
+    """
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    for _ in range(count):
+        yield (
+            (start + timedelta(days=rng.randrange(3650))).isoformat(),
+            f"Payee {rng.randrange(DESCRIPTION_COUNT)}",
+            rng.choice(CATEGORIES),
+            rng.randrange(100, 50000),
+            "income" if rng.random() < 0.2 else "expense",
+        )
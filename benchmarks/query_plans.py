@@ -0,0 +1,210 @@
+"""
+Check that the filtered transaction reads and the rollup read are answered
+from their indexes: runs each read against a scratch database, records the
+SQL it executes and asserts on the EXPLAIN QUERY PLAN of each statement.
+
+Run with `python -m benchmarks.query_plans`. Exits with a nonzero status if
+a read scans the transactions table, doesn't use the index it should, or
+(for pages) sorts its rows instead of reading them in index order.
+"""
+
+import argparse
+import sqlite3
+import sys
+from typing import Any, Callable, List, NamedTuple
+
+from benchmarks.common import generate_rows, scratch_database
+from db import db
+
+# The tables whose reads are checked; category lookups and the pool's health
+# check are not.
+CHECKED_TABLES = ("transactions", "transaction_details", "monthly_totals")
+# A SCAN of these without USING reads the whole table. A SCAN USING an index
+# walks it in order, as a first page does, and stops at the limit.
+FULL_SCANS = ("SCAN t", "SCAN transactions", "SCAN monthly_totals")
+SORTS = "USE TEMP B-TREE"
+MONTH = "2020-03"
+YEAR = "2020"
+CATEGORY = "Rent"
+PAGE_SIZE = 100
+
+
+class PlanCheck(NamedTuple):
+    """
+    A read, the index its plans must use (a prefix of the index name, as
+    either of two indexes starting with the same column may be picked) and
+    whether they must not sort.
+    """
+
+    name: str
+    call: Callable[[], Any]
+    index: str
+    ordered: bool = False
+
+
+def two_pages(order_by: str, direction: str) -> None:
+    """Reads the first page of transactions in an order and the page after it."""
+    _, cursor = db.get_transactions_page(
+        order_by=order_by, order_direction=direction, limit=PAGE_SIZE
+    )
+    db.get_transactions_page(
+        order_by=order_by, order_direction=direction, limit=PAGE_SIZE, after=cursor
+    )
+
+
+CHECKS: List[PlanCheck] = [
+    PlanCheck(
+        "month filter",
+        lambda: db.get_transactions_by_filters(month=MONTH),
+        "idx_transactions_date",
+    ),
+    PlanCheck(
+        "year filter",
+        lambda: db.get_transactions_by_filters(year=YEAR),
+        "idx_transactions_date",
+    ),
+    PlanCheck(
+        "date range",
+        lambda: db.get_transactions(start_date="2020-01-01", end_date="2020-06-30"),
+        "idx_transactions_date",
+    ),
+    PlanCheck(
+        "type filter",
+        lambda: db.get_transactions(type="income"),
+        "idx_transactions_type",
+    ),
+    PlanCheck(
+        "type and date range",
+        lambda: db.get_transactions(
+            start_date="2020-01-01", end_date="2020-06-30", type="income"
+        ),
+        "idx_transactions_type_date",
+    ),
+    PlanCheck(
+        "category filter",
+        lambda: db.get_transactions_by_filters(category=CATEGORY),
+        "idx_transactions_category",
+    ),
+    PlanCheck(
+        "category and month",
+        lambda: db.get_transactions_by_filters(month=MONTH, category=CATEGORY),
+        "idx_transactions_category_date",
+    ),
+    PlanCheck(
+        "rollup by month",
+        lambda: db.get_summary(month=MONTH),
+        "monthly_totals USING PRIMARY KEY",
+    ),
+    PlanCheck(
+        "rollup by year",
+        lambda: db.get_summary(year=YEAR),
+        "monthly_totals USING PRIMARY KEY",
+    ),
+    PlanCheck(
+        "rollup by category and year",
+        lambda: db.get_summary(year=YEAR, category=CATEGORY),
+        "monthly_totals USING PRIMARY KEY",
+    ),
+] + [
+    PlanCheck(
+        f"pages by {order_by} {direction}",
+        lambda order_by=order_by, direction=direction: two_pages(order_by, direction),
+        index,
+        ordered=True,
+    )
+    for order_by, index in (
+        ("date", "idx_transactions_date"),
+        ("desc", "idx_transactions_description"),
+        ("cat", "idx_transactions_category"),
+        ("amt", "idx_transactions_amount"),
+        ("type", "idx_transactions_type"),
+    )
+    for direction in ("asc", "desc")
+]
+
+
+def traced_statements(call: Callable[[], Any]) -> List[str]:
+    """
+    Runs a read and returns the SQL statements it executed against the
+    checked tables, with their parameters filled in.
+    """
+    statements: List[str] = []
+    db.clear_result_cache()
+    # The pool is LIFO, so the read borrows the connection traced here.
+    pool = db.get_pool()
+    conn = pool.acquire()
+    conn.set_trace_callback(statements.append)
+    pool.release(conn)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [
+        sql
+        for sql in statements
+        if sql.lstrip().upper().startswith("SELECT")
+        and any(table in sql for table in CHECKED_TABLES)
+    ]
+
+
+def query_plan(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """Returns the detail lines of a statement's EXPLAIN QUERY PLAN."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def check_plan(check: PlanCheck, plan: List[str]) -> List[str]:
+    """Returns what is wrong with a statement's plan for a check, if anything."""
+    problems: List[str] = []
+    if not any(check.index in line for line in plan):
+        problems.append(f"does not use {check.index}")
+    scans = [
+        line for line in plan if line.startswith(FULL_SCANS) and "USING" not in line
+    ]
+    if scans:
+        problems.append(f"scans ({'; '.join(scans)})")
+    if check.ordered and any(SORTS in line for line in plan):
+        problems.append("sorts its rows")
+    return problems
+
+
+def main() -> int:
+    """Checks the query plans and returns the process exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--rows", type=int, default=10_000)
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Print every plan"
+    )
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    with scratch_database(pool_size=1) as database_path:
+        db.import_transactions(generate_rows(args.rows))
+        conn = sqlite3.connect(database_path)
+        try:
+            for check in CHECKS:
+                statements = traced_statements(check.call)
+                if not statements:
+                    failures.append(f"{check.name}: ran no query")
+                    print(f"FAIL {check.name}")
+                    continue
+                problems: List[str] = []
+                for sql in statements:
+                    plan = query_plan(conn, sql)
+                    problems.extend(check_plan(check, plan))
+                    if args.verbose or problems:
+                        print(f"     {' '.join(sql.split())}")
+                        for line in plan:
+                            print(f"       {line}")
+                print(f"{'FAIL' if problems else 'ok  '} {check.name}")
+                failures.extend(f"{check.name}: {problem}" for problem in problems)
+        finally:
+            conn.close()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print(f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Benchmark of the transaction read paths: pydantic models serialized the
+way FastAPI's response_model does, TransactionRecord tuples from the row
+factory, and the JSON built by SQLite that the list endpoints return.
+
+Run with `python -m benchmarks.read_paths`.
+"""
+
+import argparse
+import json
+import time
+from typing import Callable
+
+from pydantic import TypeAdapter
+
+from api.models import TransactionRecord, TransactionResponse
+from benchmarks.common import generate_rows, scratch_database
+from cli.models import from_cents
+from db import db
+
+RESPONSE_ADAPTER = TypeAdapter(list[TransactionResponse])
+
+
+def typed() -> str:
+    """Pydantic models, validated again and serialized like response_model."""
+    transactions = db.get_transactions()
+    validated = RESPONSE_ADAPTER.validate_python(transactions, from_attributes=True)
+    return json.dumps(RESPONSE_ADAPTER.dump_python(validated, mode="json"))
+
+
+def records() -> str:
+    """TransactionRecord tuples from the row factory, dumped with json."""
+    fields = TransactionRecord._fields
+    rows = []
+    for record in db.get_transaction_records():
+        row = dict(zip(fields, record))
+        row["amount"] = from_cents(record.amount)
+        rows.append(row)
+    return json.dumps(rows)
+
+
+def raw_json() -> str:
+    """The JSON array SQLite builds, as returned by the list endpoints."""
+    content, _ = db.get_transactions_json()
+    return content
+
+
+def best_time(func: Callable[[], str], repeat: int) -> float:
+    """Returns the fastest of repeat runs of func, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    """Loads a scratch database and times each read path over all of it."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--rows", type=int, default=100_000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with scratch_database():
+        db.import_transactions(generate_rows(args.rows))
+        if json.loads(typed()) != json.loads(raw_json()):
+            raise SystemExit("The read paths returned different transactions.")
+
+        baseline = best_time(typed, args.repeat)
+        print(f"{args.rows:,} rows, best of {args.repeat}")
+        for name, func in (("typed", typed), ("records", records), ("json", raw_json)):
+            elapsed = baseline if func is typed else best_time(func, args.repeat)
+            print(
+                f"{name:>8}: {elapsed * 1000:8.1f}ms "
+                f"({args.rows / elapsed:12,.0f} rows/s, {baseline / elapsed:5.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark of the query result cache on a dashboard-like workload: the
+summary and the expense list of each month of a year, read over and over,
+with an occasional new expense invalidating the month it lands in.
+
+Run with `python -m benchmarks.result_cache`.
+"""
+
+import argparse
+import random
+import time
+from typing import Any
+
+from api.models import TransactionBase
+from benchmarks.common import generate_rows, scratch_database
+from db import db
+from utils.util import get_start_end_date_from_month
+
+MONTHS = [f"2024-{month:02d}" for month in range(1, 13)]
+
+
+def dashboard(rounds: int, write_every: int, seed: int = 0) -> float:
+    """
+    Reads the summary and expense list of a random month rounds times,
+    adding an expense every write_every reads. Returns the seconds taken.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for read in range(1, rounds + 1):
+        month = rng.choice(MONTHS)
+        start_date, end_date = get_start_end_date_from_month(month)
+        db.get_summary(month=month)
+        db.get_transactions_json(
+            start_date=start_date, end_date=end_date, type="expense"
+        )
+        if write_every and read % write_every == 0:
+            db.add_transaction(
+                TransactionBase(
+                    date=f"{rng.choice(MONTHS)}-15",
+                    description="Benchmark",
+                    category="Misc",
+                    amount=1.0,
+                    type="expense",
+                )
+            )
+    return time.perf_counter() - start
+
+
+def run(rows: int, rounds: int, write_every: int, **config: Any) -> float:
+    """Runs the dashboard on a scratch database with the given configuration."""
+    with scratch_database(**config):
+        db.import_transactions(generate_rows(rows))
+        elapsed = dashboard(rounds, write_every)
+        if config.get("result_cache_size", 1):
+            stats = db.get_result_cache().stats()
+            print(
+                f"  hits {stats['hits']:,}, misses {stats['misses']:,}, "
+                f"evictions {stats['evictions']:,}, "
+                f"invalidations {stats['invalidations']:,}"
+            )
+        return elapsed
+
+
+def main() -> None:
+    """Times the dashboard with the result cache disabled and enabled."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--rows", type=int, default=100_000)
+    parser.add_argument("-r", "--rounds", type=int, default=2000)
+    parser.add_argument(
+        "-w", "--write-every", type=int, default=50, help="0 for no writes"
+    )
+    args = parser.parse_args()
+
+    print(f"{args.rows:,} rows, {args.rounds:,} dashboard reads")
+    uncached = run(args.rows, args.rounds, args.write_every, result_cache_size=0)
+    print(f"uncached: {uncached / args.rounds * 1000:8.3f}ms per read")
+    cached = run(args.rows, args.rounds, args.write_every)
+    print(
+        f"  cached: {cached / args.rounds * 1000:8.3f}ms per read "
+        f"({uncached / cached:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
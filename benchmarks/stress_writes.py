@@ -0,0 +1,145 @@
+"""
+Stress test for concurrent writes: many threads add, update and delete
+transactions while others read, against a scratch database.
+
+Run with `python -m benchmarks.stress_writes`. Exits with a nonzero status if
+any write failed, a reader hit an error or the rollup ends up out of sync.
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from datetime import date
+
+from api.models import TransactionBase
+from benchmarks.common import scratch_database
+from db import db
+from db.config import JOURNAL_MODES, SYNCHRONOUS_LEVELS
+
+
+def writer(
+    worker: int, writes: int, failures: list[str], barrier: threading.Barrier
+) -> None:
+    """Adds transactions, then updates every other one and deletes every fourth."""
+    barrier.wait()
+    ids: list[int] = []
+    for i in range(writes):
+        transaction = TransactionBase(
+            date=date(2024, 1 + i % 12, 1 + i % 28),
+            description=f"writer {worker} #{i}",
+            category=f"cat{i % 7}",
+            amount=1.25 + i,
+            type="expense" if i % 3 else "income",
+        )
+        transaction_id = db.add_transaction(transaction)
+        if transaction_id == -1:
+            failures.append(f"writer {worker}: add #{i} failed")
+            continue
+        ids.append(transaction_id)
+        if i % 2 and not db.update_transaction(
+            transaction_id, transaction.model_copy(update={"amount": 2.5 + i})
+        ):
+            failures.append(f"writer {worker}: update #{i} failed")
+    for transaction_id in ids[::4]:
+        if not db.delete_transaction(transaction_id):
+            failures.append(f"writer {worker}: delete {transaction_id} failed")
+
+
+def reader(
+    stop: threading.Event,
+    latencies: list[float],
+    failures: list[str],
+    barrier: threading.Barrier,
+) -> None:
+    """Reads summaries and pages of transactions until told to stop."""
+    barrier.wait()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            db.get_summary(year="2024")
+            db.get_transactions_page(order_by="date", limit=50)
+        except Exception as e:  # pylint: disable=broad-except
+            failures.append(f"reader: {e!r}")
+        latencies.append(time.perf_counter() - start)
+
+
+def main() -> int:
+    """Runs the stress test and returns the process exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-w", "--writers", type=int, default=16)
+    parser.add_argument("-r", "--readers", type=int, default=8)
+    parser.add_argument("-n", "--writes", type=int, default=200, help="Per writer")
+    parser.add_argument("-jm", "--journal-mode", choices=JOURNAL_MODES, default="wal")
+    parser.add_argument(
+        "-sy", "--synchronous", choices=SYNCHRONOUS_LEVELS, default="normal"
+    )
+    parser.add_argument("-gc", "--group-commit", action="store_true")
+    args = parser.parse_args()
+
+    with scratch_database(
+        journal_mode=args.journal_mode,
+        synchronous=args.synchronous,
+        group_commit=args.group_commit,
+    ):
+        failures: list[str] = []
+        latencies: list[float] = []
+        stop = threading.Event()
+        barrier = threading.Barrier(args.writers + args.readers + 1)
+        writers = [
+            threading.Thread(target=writer, args=(i, args.writes, failures, barrier))
+            for i in range(args.writers)
+        ]
+        readers = [
+            threading.Thread(target=reader, args=(stop, latencies, failures, barrier))
+            for _ in range(args.readers)
+        ]
+        for thread in writers + readers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        added = args.writers * args.writes
+        deleted = args.writers * len(range(0, args.writes, 4))
+        remaining = len(db.get_transactions())
+        if remaining != added - deleted:
+            failures.append(f"expected {added - deleted} rows, found {remaining}")
+        out_of_sync = db.verify_monthly_totals()
+        if out_of_sync != 0:
+            failures.append(f"{out_of_sync} monthly_totals groups out of sync")
+        writer_stats = db.get_writer().stats()
+
+    operations = added + args.writers * (args.writes // 2) + deleted
+    print(
+        f"{args.writers} writers, {args.readers} readers, "
+        f"journal_mode={args.journal_mode}, synchronous={args.synchronous}, "
+        f"group_commit={args.group_commit}"
+    )
+    print(f"Writes: {operations} in {elapsed:.2f}s ({operations / elapsed:.0f}/s)")
+    print(
+        f"Commits: {writer_stats["commits"]}, "
+        f"{writer_stats["jobs_per_commit"]:.2f} writes per commit, "
+        f"largest group {writer_stats["largest_group"]}"
+    )
+    if latencies:
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99)]
+        print(
+            f"Reads: {len(latencies)}, median {statistics.median(latencies) * 1000:.1f}"
+            f"ms, p99 {p99 * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms"
+        )
+    for failure in failures[:20]:
+        print(f"FAIL: {failure}")
+    print(f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,495 @@
+"""
+Benchmark suite over synthetic ledgers: builds ledgers of several sizes with
+db/generate_seed_data.py, then times each database function and API endpoint
+(the latter through an in-process test client) across filter combinations.
+
+Each case's throughput, latency percentiles and peak Python memory are
+printed and written as JSON. Run with `python -m benchmarks.suite`; pass
+`--compare` with an earlier run's JSON to exit with a nonzero status if a
+case has become slower, or uses more memory, than the threshold allows.
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from benchmarks.common import scratch_database
+from db import db
+from db.generate_seed_data import (
+    DEFAULT_CATEGORIES,
+    generate_seed_batches,
+    write_json,
+)
+from utils.util import get_start_end_date_from_month
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEDGER_START = "2015-01-01"
+LEDGER_END = "2024-12-31"
+MONTH = "2020-06"
+YEAR = "2020"
+CATEGORY = "Groceries"
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+# Cases that return a whole category of the ledger are skipped above this.
+MAX_SCAN_ROWS = 1_000_000
+SEED_FILE_ROWS = 500
+MIN_ITERATIONS = 5
+DEFAULT_MIN_TIME = 1.0
+DEFAULT_MAX_ITERATIONS = 1000
+DEFAULT_THRESHOLD = 0.2
+# Slowdowns and growth below these are noise, however large in proportion.
+MIN_REGRESSION_MS = 0.05
+MIN_REGRESSION_KB = 64.0
+
+
+class Case(NamedTuple):
+    """A call to time, named by its target (function or route) and filters."""
+
+    group: str
+    target: str
+    filters: str
+    call: Callable[[], Any]
+    max_rows: Optional[int] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.group}:{self.target}[{self.filters}]"
+
+
+def ledger_rows(size: int, seed: int = 0) -> Iterator[Tuple[Any, ...]]:
+    """
+    Yields size (date, description, category, amount, type) rows from the
+    seed data generator, with the amount in cents, as import_transactions
+    takes them. The same seed always gives the same ledger.
+    """
+    return itertools.chain.from_iterable(
+        generate_seed_batches(
+            LEDGER_START, LEDGER_END, size, DEFAULT_CATEGORIES, seed
+        )
+    )
+
+
+def write_seed_file(seed: int = 0) -> None:
+    """Writes the seed_data.json that seed() loads into the current directory."""
+    write_json(
+        db.SEED_DATA_FILE,
+        generate_seed_batches(
+            LEDGER_START, LEDGER_END, SEED_FILE_ROWS, DEFAULT_CATEGORIES, seed
+        ),
+    )
+
+
+def new_expense() -> Any:
+    """Returns an expense to add in the write cases."""
+    from api.models import TransactionBase
+
+    return TransactionBase(
+        date=f"{MONTH}-15",
+        description="Benchmark",
+        category=CATEGORY,
+        amount=12.34,
+        type="expense",
+    )
+
+
+def quietly(function: Callable[[], Any]) -> Callable[[], Any]:
+    """Wraps a function that prints on success, so it doesn't fill the report."""
+
+    def call() -> Any:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function()
+
+    return call
+
+
+def db_read_cases() -> List[Case]:
+    """Returns the database function cases, which leave the ledger unchanged."""
+    start_date, end_date = get_start_end_date_from_month(MONTH)
+    month = {"start_date": start_date, "end_date": end_date}
+    page = {
+        "order_by": "amt",
+        "order_direction": "desc",
+        "limit": db.DEFAULT_PAGE_SIZE,
+    }
+    cases: List[Case] = []
+    for function in (db.get_transactions, db.get_transactions_json):
+        target = function.__name__
+        cases += [
+            Case("db", target, "month", partial(function, **month)),
+            Case(
+                "db",
+                target,
+                "month,category",
+                partial(function, **month, category=CATEGORY),
+            ),
+            Case(
+                "db",
+                target,
+                "month,type",
+                partial(function, **month, type="expense"),
+            ),
+            Case(
+                "db",
+                target,
+                "category",
+                partial(function, category=CATEGORY),
+                MAX_SCAN_ROWS,
+            ),
+            Case("db", target, "page,by amount", partial(function, **page)),
+        ]
+    for function in (db.get_transactions_by_filters, db.get_summary):
+        target = function.__name__
+        cases += [
+            Case("db", target, "month", partial(function, month=MONTH)),
+            Case("db", target, "year", partial(function, year=YEAR)),
+            Case(
+                "db",
+                target,
+                "month,category",
+                partial(function, month=MONTH, category=CATEGORY),
+            ),
+        ]
+    cases += [
+        Case(
+            "db",
+            "get_transactions_by_filters",
+            "category",
+            partial(db.get_transactions_by_filters, category=CATEGORY),
+            MAX_SCAN_ROWS,
+        ),
+        Case("db", "get_summary", "all", db.get_summary),
+        Case(
+            "db",
+            "get_summary",
+            "category",
+            partial(db.get_summary, category=CATEGORY),
+        ),
+        Case("db", "get_expense_totals", "all", db.get_expense_totals),
+        Case(
+            "db",
+            "get_expense_totals",
+            "month",
+            partial(db.get_expense_totals, MONTH),
+        ),
+        Case("db", "get_categories", "all", db.get_categories),
+    ]
+    return cases
+
+
+def db_write_cases() -> List[Case]:
+    """Returns the database function cases that add transactions."""
+    return [
+        Case(
+            "db", "add_transaction", "one", lambda: db.add_transaction(new_expense())
+        ),
+        Case("db", "seed", f"{SEED_FILE_ROWS} rows", quietly(db.seed)),
+    ]
+
+
+def api_read_cases(client: Any) -> List[Case]:
+    """Returns the API endpoint cases, which leave the ledger unchanged."""
+
+    def get(path: str, **params: Any) -> Callable[[], Any]:
+        def request() -> None:
+            response = client.get(path, params=params)
+            response.raise_for_status()
+            # Streamed responses are only read here.
+            response.read()
+
+        return request
+
+    def case(
+        path: str, filters: str, max_rows: Optional[int] = None, **params: Any
+    ) -> Case:
+        return Case("api", f"GET {path}", filters, get(path, **params), max_rows)
+
+    return [
+        case("/expenses/", "month", date=MONTH),
+        case("/expenses/", "month,category", date=MONTH, category=CATEGORY),
+        case("/expenses/", "category", MAX_SCAN_ROWS, category=CATEGORY),
+        case("/expenses/", "page", limit=db.DEFAULT_PAGE_SIZE),
+        case("/income/", "month", date=MONTH),
+        case("/summary/", "all"),
+        case("/summary/", "month", date=MONTH),
+        case("/categories/", "all"),
+        case(
+            "/export/csv/",
+            "year",
+            start_date=f"{YEAR}-01-01",
+            end_date=f"{YEAR}-12-31",
+        ),
+        case(
+            "/export/csv/",
+            "year,gzip",
+            start_date=f"{YEAR}-01-01",
+            end_date=f"{YEAR}-12-31",
+            gzip=True,
+        ),
+    ]
+
+
+def api_write_cases(client: Any) -> List[Case]:
+    """Returns the API endpoint cases that add transactions."""
+    body = new_expense().model_dump(mode="json")
+
+    def post_expense() -> None:
+        client.post("/expenses/", json=body).raise_for_status()
+
+    return [Case("api", "POST /expenses/", "one", post_expense)]
+
+
+def percentile(timings: List[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of sorted timings."""
+    return timings[max(math.ceil(fraction * len(timings)) - 1, 0)]
+
+
+def measure(
+    call: Callable[[], Any], min_time: float, max_iterations: int
+) -> dict[str, Any]:
+    """
+    Times call after one warm-up call, repeating it for at least min_time
+    seconds (and MIN_ITERATIONS times) or max_iterations times, whichever
+    comes first. Peak memory is taken on one more, separate call, as tracing
+    allocations slows it down.
+    """
+    call()
+    timings: List[float] = []
+    total = 0.0
+    while len(timings) < MIN_ITERATIONS or (
+        total < min_time and len(timings) < max_iterations
+    ):
+        start = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "iterations": len(timings),
+        "ops_per_sec": len(timings) / total,
+        "mean_ms": total / len(timings) * 1000,
+        "p50_ms": percentile(timings, 0.50) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+        "max_ms": timings[-1] * 1000,
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def run_cases(
+    cases: List[Case], size: int, args: argparse.Namespace
+) -> List[dict[str, Any]]:
+    """Measures the selected cases on a ledger of size rows and prints each."""
+    results: List[dict[str, Any]] = []
+    for case in cases:
+        if case.max_rows is not None and size > case.max_rows:
+            continue
+        if args.filter and not any(word in case.key for word in args.filter):
+            continue
+        result = {
+            "size": size,
+            "group": case.group,
+            "target": case.target,
+            "filters": case.filters,
+            **measure(case.call, args.min_time, args.max_iterations),
+        }
+        print(
+            f"{size:>10,} {case.key:<52} {result['ops_per_sec']:>9.1f}/s "
+            f"{result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+            f"{result['p99_ms']:>9.3f} {result['peak_memory_kb']:>10.1f}"
+        )
+        results.append(result)
+    return results
+
+
+def run_size(
+    size: int, args: argparse.Namespace
+) -> Tuple[dict[str, Any], List[dict[str, Any]]]:
+    """Builds a ledger of size rows and runs every case against it."""
+    from fastapi.testclient import TestClient
+
+    from api.main import app
+
+    config = {} if args.result_cache else {"result_cache_size": 0}
+    with scratch_database(**config):
+        start = time.perf_counter()
+        imported = db.import_transactions(ledger_rows(size, args.seed))
+        if imported != size:
+            raise RuntimeError(f"Could not build a ledger of {size:,} rows.")
+        ledger = {"size": size, "build_seconds": time.perf_counter() - start}
+        write_seed_file(args.seed)
+
+        results = run_cases(db_read_cases(), size, args)
+        with TestClient(app) as client:
+            results += run_cases(api_read_cases(client), size, args)
+            # The ledger grows from here on, so these run last.
+            results += run_cases(db_write_cases(), size, args)
+            results += run_cases(api_write_cases(client), size, args)
+    return ledger, results
+
+
+def git_commit() -> Optional[str]:
+    """Returns the commit the tree is at, if it is a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result: dict[str, Any]) -> str:
+    """Returns the key a result is matched on between runs."""
+    return f"{result['size']} {result['group']}:{result['target']}[{result['filters']}]"
+
+
+def compare(
+    results: List[dict[str, Any]], baseline: List[dict[str, Any]], threshold: float
+) -> List[str]:
+    """
+    Returns a description of each case whose median latency or peak memory
+    has grown by more than threshold (a fraction) over the baseline's.
+    """
+    before_by_key = {result_key(result): result for result in baseline}
+    regressions: List[str] = []
+    for result in results:
+        before = before_by_key.get(result_key(result))
+        if before is None:
+            continue
+        for field, unit, floor in (
+            ("p50_ms", "ms", MIN_REGRESSION_MS),
+            ("peak_memory_kb", "KB", MIN_REGRESSION_KB),
+        ):
+            old, new = before[field], result[field]
+            if new - old > max(old * threshold, floor):
+                growth = (new / old - 1) * 100 if old else math.inf
+                regressions.append(
+                    f"{result_key(result)}: {field} {old:.3f}{unit} -> "
+                    f"{new:.3f}{unit} ({growth:+.0f}%)"
+                )
+    return regressions
+
+
+def main() -> int:
+    """Runs the suite and returns the process exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "-s",
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Ledger sizes in rows",
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        nargs="+",
+        help="Only run the cases whose key contains one of these",
+    )
+    parser.add_argument(
+        "-t",
+        "--min-time",
+        type=float,
+        default=DEFAULT_MIN_TIME,
+        help="Seconds to repeat each case for",
+    )
+    parser.add_argument(
+        "-m", "--max-iterations", type=int, default=DEFAULT_MAX_ITERATIONS
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--result-cache",
+        action="store_true",
+        help="Keep the query result cache on, so repeated reads are cache hits",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="benchmark_results.json",
+        help="File to write the results to",
+    )
+    parser.add_argument("-c", "--compare", help="Results of an earlier run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Growth over the earlier run that counts as a regression",
+    )
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    baseline: Optional[dict[str, Any]] = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(
+        f"{'Rows':>10} {'Case':<52} {'Throughput':>11} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9} {'Peak KB':>10}"
+    )
+    ledgers: List[dict[str, Any]] = []
+    results: List[dict[str, Any]] = []
+    for size in args.sizes:
+        ledger, size_results = run_size(size, args)
+        ledgers.append(ledger)
+        results += size_results
+        print(f"{size:>10,} ledger built in {ledger['build_seconds']:.1f}s")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "args": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("output", "compare")
+            },
+        },
+        "ledgers": ledgers,
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline["results"], args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    print(
+        f"{len(regressions)} regressions against {baseline['meta'].get('commit')} "
+        f"at a {args.threshold:.0%} threshold"
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
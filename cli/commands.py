@@ -1,66 +1,109 @@
-"""Holds the commands used for the CLI."""
+"""
+Holds the commands used for the CLI.
+
+cli.main imports this module only once it knows which command to run, and
+the slow imports that only some commands need (pydantic to validate a new or
+edited transaction, matplotlib to plot) are done inside those commands.
+
+Each command returns its exit status: 0 if it succeeded, or 1 if it failed
+(after printing why).
+"""
 
 import argparse
 import calendar
+import csv
+import itertools
+import os
+import sqlite3
+import sys
+import time
 from datetime import date
-import json
-from typing import Any, List, Optional, Tuple
-from api.models import TransactionBase
-from db.db import *
-from cli.models import TransactionType
-import matplotlib
-
-from utils.util import write_to_csv
-
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
-
-CSV_FILENAME = "transactions.csv"
-
-
-def add_income_command(args: argparse.Namespace) -> None:
+from typing import TYPE_CHECKING, Iterator, Optional, TextIO, Tuple
+from cli.models import TransactionType, from_cents
+from cli.output import open_output, write_transaction_table
+from db.config import get_config, get_file_config, save_config
+from db.db import (
+    DEFAULT_PAGE_SIZE,
+    add_transaction,
+    delete_all_transactions,
+    delete_transaction,
+    get_categories,
+    get_expense_totals,
+    get_summary,
+    get_transaction,
+    import_transactions,
+    iter_transactions,
+    next_page_cursor,
+    rebuild_monthly_totals,
+    update_transaction,
+    verify_monthly_totals,
+)
+
+from utils.charts import (
+    CHART_FORMATS,
+    FIGURE_SIZE,
+    draw_category_chart,
+    expenses_chart_title,
+    render_category_chart,
+)
+from utils.util import (
+    CSV_FILENAME,
+    iter_import_records,
+    parse_transaction_record,
+    write_to_csv,
+)
+
+if TYPE_CHECKING:
+    # pydantic is only imported by the commands that validate a transaction.
+    from pydantic import ValidationError
+
+MAX_REPORTED_IMPORT_ERRORS = 10
+
+
+def add_income_command(args: argparse.Namespace) -> int:
     """Calls the add_transaction_command with income type."""
-    add_transaction_command(args, TransactionType.INCOME)
+    return add_transaction_command(args, TransactionType.INCOME)
 
 
-def add_expense_command(args: argparse.Namespace) -> None:
+def add_expense_command(args: argparse.Namespace) -> int:
     """Calls the add_transaction_command with expense type."""
-    add_transaction_command(args, TransactionType.EXPENSE)
+    return add_transaction_command(args, TransactionType.EXPENSE)
+
+
+def validation_message(error: "ValidationError") -> str:
+    """Returns the message of the first error in a pydantic ValidationError."""
+    first = error.errors()[0]
+    # Errors raised by our own validators carry the exception we raised.
+    cause = first.get("ctx", {}).get("error")
+    message = str(cause) if cause is not None else first["msg"]
+    field = ".".join(str(part) for part in first["loc"])
+    return f"{field}: {message}" if field else message
 
 
 def add_transaction_command(
     args: argparse.Namespace, transaction_type: TransactionType
-) -> None:
+) -> int:
     """Adds a transaction (income or expense) based on arguments."""
-    transaction: TransactionBase = TransactionBase(
-        date=args.date if args.date else date.today(),
-        description=args.description,
-        category=args.category,
-        amount=args.amount,
-        type=str(transaction_type),
-    )
+    from api.models import TransactionBase
+    from pydantic import ValidationError
+
+    try:
+        transaction: TransactionBase = TransactionBase(
+            date=args.date if args.date else date.today(),
+            description=args.description,
+            category=args.category,
+            amount=args.amount,
+            type=str(transaction_type),
+        )
+    except ValidationError as e:
+        print(f"Error: {validation_message(e)}")
+        return 1
 
     transaction_id = add_transaction(transaction)
-    if transaction_id > 0:
-        print(f"{transaction_type.value.capitalize()} added successfully.")
-        get_transaction_command(argparse.Namespace(transaction_id=transaction_id))
-
-
-def calculate_summary(
-    transactions: List[Tuple[Any, ...]],
-) -> Tuple[float, float, float]:
-    """Calculates the summary (total income, expenses, balance)."""
-    total_income: float = 0.0
-    total_expenses: float = 0.0
-    for transaction in transactions:
-        amount: float = transaction[4]
-        transaction_type_str: str = transaction[5]
-        if transaction_type_str == str(TransactionType.INCOME):
-            total_income += amount
-        elif transaction_type_str == str(TransactionType.EXPENSE):
-            total_expenses += amount
-    net_balance: float = total_income - total_expenses
-    return total_income, total_expenses, net_balance
+    if transaction_id <= 0:
+        return 1
+    print(f"{transaction_type.value.capitalize()} added successfully.")
+    return get_transaction_command(argparse.Namespace(transaction_id=transaction_id))
 
 
 def get_month_name(month_number: str) -> str:
@@ -74,24 +117,28 @@ def get_month_name(month_number: str) -> str:
         return ""
 
 
-def get_transaction_command(args: argparse.Namespace) -> None:
+def get_transaction_command(args: argparse.Namespace) -> int:
     """Command to get a transaction by ID."""
 
     config = get_config()
     transaction = get_transaction(args.transaction_id)
     if not transaction:
         print("No transaction exists with that ID.")
-        return
+        return 1
     print(f"\n--- Transaction ID {transaction[0]} ---")
     print(f"Date: {transaction[1]}")
     print(f"Description: {transaction[2]}")
     print(f"Category: {transaction[3]}")
-    print(f"Amount: {config["currency_symbol"]}{transaction[4]:.2f}")
+    print(f"Amount: {config["currency_symbol"]}{from_cents(transaction[4]):.2f}")
     print(f"Type: {str(transaction[5]).capitalize()}")
+    return 0
 
 
-def get_transactions_command(args: argparse.Namespace) -> None:
-    """Gets transactions by category, optionally within a date range."""
+def get_transactions_command(args: argparse.Namespace) -> int:
+    """
+    Gets transactions by category, optionally within a date range, printing
+    them (through the pager, on a terminal) as they are fetched.
+    """
 
     config = get_config()
     start_date: Optional[str] = args.start_date
@@ -100,46 +147,57 @@ def get_transactions_command(args: argparse.Namespace) -> None:
     order_by: Optional[str] = args.order_by
     order_direction: Optional[str] = args.order_direction
     type: Optional[str] = args.type
+    limit: Optional[int] = args.limit
+    page: Optional[str] = args.page
 
-    transactions = get_transactions(
-        start_date, end_date, category, order_by, order_direction, type
-    )
-    print(f"\n{len(transactions)} transactions found!")
-    print("\n--- Transaction Details ---")
-
-    if transactions:
-        # Calculate max lengths for formatting
-        max_date_len = max(len(str(t.date)) for t in transactions)
-        max_desc_len = max(len(t.description) for t in transactions)
-        max_cat_len = max(max(len(t.category) for t in transactions), 8)
-        max_am_len = max(len(format(t.amount, ",.2f")) + 1 for t in transactions)
-
-        header = (
-            f" {'Date':<{max_date_len}} | "
-            f"{'Description':<{max_desc_len}} | "
-            f"{'Category':<{max_cat_len}} | "
-            f"{'Amount':>{max_am_len+1}} | "
-            f"{'Type':<6} "
+    if page and not limit:
+        limit = DEFAULT_PAGE_SIZE
+    # The filters are checked, and the query run, before starting the pager.
+    try:
+        rows = iter_transactions(
+            start_date,
+            end_date,
+            category,
+            order_by,
+            order_direction,
+            type,
+            limit=None if limit is None else limit + 1,
+            after=page,
         )
-        print("-" * len(header))
-        print(header)
-        print("-" * len(header))
-
-        for t in transactions:
-            print(
-                (
-                    f" {str(t.date):<{max_date_len}} | "
-                    f"{t.description:<{max_desc_len}} | "
-                    f"{t.category:<{max_cat_len}} | "
-                    f"{config["currency_symbol"]} {t.amount:>{max_am_len - 1},.2f} | "
-                    f"{str(t.type).capitalize()}"
-                )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    except sqlite3.Error as e:
+        print(f"Error retrieving transactions: {e}")
+        return 1
+    try:
+        first = next(rows, None)
+        if first is None:
+            print("\n0 transactions found!")
+            print("No transactions to display.")
+            return 0
+
+        with open_output(not args.no_pager) as out:
+            out.write("\n--- Transaction Details ---\n")
+            count, last_row, has_more = write_transaction_table(
+                itertools.chain([first], rows),
+                out,
+                config["currency_symbol"],
+                limit,
             )
-    else:
-        print("No transactions to display.")
+            out.write(f"\n{count} transactions found!\n")
+            if has_more and last_row is not None:
+                # The next page starts after the last row shown.
+                next_page = next_page_cursor(order_by, last_row)
+                out.write(
+                    f"\nMore transactions available. Next page: --page {next_page}\n"
+                )
+    finally:
+        rows.close()
+    return 0
 
 
-def view_summary_command(args: argparse.Namespace) -> None:
+def view_summary_command(args: argparse.Namespace) -> int:
     """Command to view the transaction summary."""
 
     config = get_config()
@@ -147,7 +205,6 @@ def view_summary_command(args: argparse.Namespace) -> None:
     year_filter: Optional[str] = args.year
     category_filter: Optional[str] = args.category
 
-    transactions: List[Tuple[Any, ...]] = []
     filter_description = "Overall"
     query_month = None
     query_year = None
@@ -177,17 +234,17 @@ def view_summary_command(args: argparse.Namespace) -> None:
                 filter_description = f"for {month_name} {year_filter}"
             else:
                 print("Must specify year along with month")
-                return
+                return 1
         else:
             print("Invalid month format. Please use MM or YYYY-MM.")
-            return
+            return 1
     elif year_filter:
         if len(year_filter) == 4 and year_filter.isdigit():
             query_year = year_filter
             filter_description = f"for {year_filter}"
         else:
             print("Invalid year format. Please use YYYY.")
-            return
+            return 1
 
     if category_filter:
         filter_description = (
@@ -196,53 +253,52 @@ def view_summary_command(args: argparse.Namespace) -> None:
             else f"{filter_description}, category '{category_filter}'"
         )
 
-    transactions = get_transactions_by_filters(
+    summary = get_summary(
         month=month_filter, year=year_filter, category=category_filter
     )
 
     print(f"\n--- Transaction Summary ({filter_description}) ---")
 
-    if transactions:
+    if summary["income_by_category"] or summary["expenses_by_category"]:
         currency_symbol = config["currency_symbol"]
-        total_income, total_expenses, net_balance = calculate_summary(transactions)
-        print(f"Total Income: {currency_symbol}{total_income:,.2f}")
-        print(f"Total Expenses: {currency_symbol}{total_expenses:,.2f}")
-        print(f"Net Balance: {currency_symbol}{net_balance:,.2f}")
+        print(f"Total Income: {currency_symbol}{summary["total_income"]:,.2f}")
+        print(f"Total Expenses: {currency_symbol}{summary["total_expenses"]:,.2f}")
+        print(f"Net Balance: {currency_symbol}{summary["net_balance"]:,.2f}")
 
         if args.expense:
-            _detail_print(transactions, TransactionType.EXPENSE, currency_symbol)
+            _detail_print(
+                summary["expenses_by_category"],
+                TransactionType.EXPENSE,
+                currency_symbol,
+            )
         if args.income:
-            _detail_print(transactions, TransactionType.INCOME, currency_symbol)
+            _detail_print(
+                summary["income_by_category"], TransactionType.INCOME, currency_symbol
+            )
     else:
         print(
             "No transactions found for the specified filters."
             if month_filter or year_filter or category_filter
             else "No transactions found."
         )
+    return 0
 
 
 def _detail_print(
-    transactions: List[Tuple[Any, ...]],
+    items_by_category: dict[str, float],
     transaction_type: TransactionType,
     currency_symbol: str,
 ):
     type_str = transaction_type.name.lower()
 
     print(f"\n--- {type_str.capitalize()} by Category ---")
-    items = [t for t in transactions if t[5] == type_str]
-    items_by_category: dict[str, float] = {}
-    for item in items:
-        cat = item[3]
-        amt = item[4]
-        items_by_category[cat] = items_by_category.get(cat, 0) + amt
-
     max_cat_len = max(len(c) for c in items_by_category) if items_by_category else 0
     print("-" * (max_cat_len + 15))
     for cat, amt in sorted(items_by_category.items()):
         print(f" {cat:<{max_cat_len}}  {currency_symbol} {amt:>{10},.2f} ")
 
 
-def edit_transaction_command(args: argparse.Namespace) -> None:
+def edit_transaction_command(args: argparse.Namespace) -> int:
     """Command for editing an existing transaction."""
 
     transaction_id = args.transaction_id
@@ -255,63 +311,84 @@ def edit_transaction_command(args: argparse.Namespace) -> None:
         and args.type is None
     ):
         print("Must include at least one option for editing a transaction")
-        return
+        return 1
 
     # Retrieve the transaction from the database
     transaction = get_transaction(transaction_id)
     if not transaction:
         print(f"Transaction with ID {transaction_id} not found.")
-        return
+        return 1
 
     # Collect updates from flags
-    transaction_create: TransactionBase = TransactionBase(
-        date=args.date or transaction[1],
-        description=args.description or transaction[2],
-        category=args.category or transaction[3],
-        amount=args.amount or transaction[4],
-        type=args.type or transaction[5],
-    )
+    from api.models import TransactionBase
+    from pydantic import ValidationError
+
+    try:
+        transaction_create: TransactionBase = TransactionBase(
+            date=args.date or transaction[1],
+            description=args.description or transaction[2],
+            category=args.category or transaction[3],
+            amount=args.amount or from_cents(transaction[4]),
+            type=args.type or transaction[5],
+        )
+    except ValidationError as e:
+        print(f"Error: {validation_message(e)}")
+        return 1
     # Update the transaction in the database
-    update_transaction(transaction_id, transaction_create)
+    if not update_transaction(transaction_id, transaction_create):
+        return 1
 
     print("Transaction updated successfully!")
-    get_transaction_command(args)
+    return get_transaction_command(args)
 
 
-def delete_transaction_command(args: argparse.Namespace) -> None:
+def delete_transaction_command(args: argparse.Namespace) -> int:
     """Command to delete a transaction by ID."""
 
     transaction_id = args.transaction_id
     if transaction_id == -1:
         if delete_all_transactions():
             print("All transactions deleted successfully")
-            return
+            return 0
 
     if delete_transaction(transaction_id):
         print(f"Transaction with ID {transaction_id} deleted successfully!")
-    else:
-        print(
-            f"Transaction with ID {transaction_id} not found or could not be deleted."
-        )
+        return 0
+    print(f"Transaction with ID {transaction_id} not found or could not be deleted.")
+    return 1
 
 
-def configure_command(args: argparse.Namespace) -> None:
+def configure_command(args: argparse.Namespace) -> int:
     """Command to allow the user to configure application settings."""
 
-    config = get_config()
+    # Start from the file, so that an override (such as BUDGET_DB_PATH) from
+    # the environment isn't saved into it.
+    config = get_file_config()
     new_db_path = args.db_path or config["db_path"]
     currency_symbol = args.currency_symbol or config["currency_symbol"]
+    pool_size = args.pool_size or config["pool_size"]
 
     config["db_path"] = new_db_path
     config["currency_symbol"] = currency_symbol
-
-    with open(CONFIG_FILE, "w", encoding="utf-8") as config_file:
-        json.dump(config, config_file, indent=4)
+    config["pool_size"] = pool_size
+    config["journal_mode"] = args.journal_mode or config["journal_mode"]
+    config["synchronous"] = args.synchronous or config["synchronous"]
+    if args.busy_timeout is not None:
+        config["busy_timeout"] = args.busy_timeout
+    if args.group_commit:
+        config["group_commit"] = args.group_commit == "on"
+    if args.result_cache_size is not None:
+        config["result_cache_size"] = args.result_cache_size
+    if args.metrics:
+        config["metrics"] = args.metrics == "on"
+
+    save_config(config)
 
     print("Configuration saved successfully!")
+    return 0
 
 
-def export_transactions_to_csv_command(args: argparse.Namespace) -> None:
+def export_transactions_to_csv_command(args: argparse.Namespace) -> int:
     """Exports transactions to a CSV file."""
 
     start_date: Optional[str] = args.start_date
@@ -321,15 +398,22 @@ def export_transactions_to_csv_command(args: argparse.Namespace) -> None:
     order_by: Optional[str] = args.order_by
     order_direction: Optional[str] = args.order_direction
 
-    transactions = get_transactions(
-        start_date, end_date, category, order_by, order_direction
-    )
+    try:
+        transactions = iter_transactions(
+            start_date, end_date, category, order_by, order_direction
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    except sqlite3.Error as e:
+        print(f"Error retrieving transactions: {e}")
+        return 1
     filename = filename or CSV_FILENAME
 
-    write_to_csv(filename, transactions)
+    return 0 if write_to_csv(filename, transactions) else 1
 
 
-def plot_expenses_by_category_command(args: argparse.Namespace) -> None:
+def plot_expenses_by_category_command(args: argparse.Namespace) -> int:
     """Plots a bar graph of expenses by category."""
 
     month_filter: Optional[str] = args.month
@@ -345,44 +429,129 @@ def plot_expenses_by_category_command(args: argparse.Namespace) -> None:
                 raise ValueError
         except ValueError:
             print(f"Error: Invalit month format. Please use YYYY-MM")
-            return
-
-    start_date: Optional[str] = (
-        f"{year_filter}-{month_str}-01" if month_filter else None
-    )
-    end_date: Optional[str] = None
-    if year_filter and month_int:
-        end_date = (
-            f"{year_filter}-{month_str}-"
-            + str(calendar.monthrange(int(year_filter), int(month_int))[1])
-            if month_filter
-            else None
-        )
+            return 1
 
-    transactions = get_transactions(start_date, end_date, order_by="date")
-    expenses_by_category: dict[str, float] = {}
-    for t in transactions:
-        if t.type == "expense":
-            category = t.category
-            amount = t.amount
-            expenses_by_category[category] = (
-                expenses_by_category.get(category, 0) + amount
-            )
+    output: Optional[str] = args.output
+    image_format = os.path.splitext(output)[1].lower().lstrip(".") if output else ""
+    if output and image_format not in CHART_FORMATS:
+        print(f"Error: Unsupported chart format. Please use {', '.join(CHART_FORMATS)}")
+        return 1
 
+    expenses_by_category = get_expense_totals(month_filter)
     if not expenses_by_category:
         print("No expenses found for the specified period.")
-        return
+        return 1
+
+    title = expenses_chart_title(month_filter)
+    if not output:
+        return 0 if plot_category_totals(expenses_by_category, title) else 1
+    try:
+        with open(output, "wb") as chart_file:
+            chart_file.write(
+                render_category_chart(expenses_by_category, title, image_format)
+            )
+    except OSError as e:
+        print(f"Error saving chart: {e}")
+        return 1
+    print(f"Chart saved to {output}")
+    return 0
+
+
+def plot_category_totals(totals_by_category: dict[str, float], title: str) -> bool:
+    """
+    Shows a bar graph of spending per category, such as the totals from
+    get_category_totals or TransactionBatch.totals_by_category, in a window.
+    Returns False if there is no display to show it on.
+    """
+
+    import matplotlib.pyplot as plt
+
+    if plt.get_backend().lower() == "agg":
+        print("No display is available; use --output to save the chart to a file.")
+        return False
+    figure, axes = plt.subplots(figsize=FIGURE_SIZE)
+    draw_category_chart(axes, totals_by_category, title)
+    figure.tight_layout()
+    plt.show()
+    return True
+
+
+def list_categories_command(args: argparse.Namespace) -> int:
+    """Command to list the categories and their number of transactions."""
+
+    categories = get_categories()
+    if not categories:
+        print("No categories found.")
+        return 0
+
+    max_name_len = max(len("Category"), *(len(name) for _, name, _ in categories))
+    print("\n--- Categories ---")
+    print(f" {'Category':<{max_name_len}}  {'Transactions':>12} ")
+    print("-" * (max_name_len + 16))
+    for _, name, count in categories:
+        print(f" {name:<{max_name_len}}  {count:>12,} ")
+    return 0
+
+
+def rebuild_rollup_command(args: argparse.Namespace) -> int:
+    """Verifies or rebuilds the monthly totals used for summaries."""
+
+    mismatches = verify_monthly_totals()
+    if mismatches < 0:
+        return 1
+    if mismatches == 0:
+        print("Monthly totals are in sync with the transactions.")
+    else:
+        print(f"Monthly totals are out of sync for {mismatches} group(s).")
+
+    if args.verify or mismatches == 0:
+        return 0
+    if not rebuild_monthly_totals():
+        return 1
+    print("Monthly totals rebuilt successfully!")
+    return 0
 
-    categories = list(expenses_by_category.keys())
-    spending = list(expenses_by_category.values())
 
-    plt.figure(figsize=(10, 6))  # type: ignore
-    plt.bar(categories, spending, color="skyblue")  # type: ignore
-    plt.xlabel("Expense Category")  # type: ignore
-    plt.ylabel("Total Spending")  # type: ignore
-    plt.title(  # type: ignore
-        f"Expenses by Category {'for ' + month_filter if month_filter else 'Overall'}"
+def import_transactions_command(args: argparse.Namespace) -> int:
+    """Imports transactions from a CSV or JSON-lines file (or stdin)."""
+
+    filename: str = args.file
+    file_format: Optional[str] = args.format
+    if not file_format:
+        file_format = "jsonl" if filename.endswith((".jsonl", ".json")) else "csv"
+
+    skipped = 0
+
+    def valid_rows(file: TextIO) -> Iterator[Tuple[str, str, str, int, str]]:
+        nonlocal skipped
+        for line_number, record in iter_import_records(file, file_format):
+            try:
+                yield parse_transaction_record(record)
+            except ValueError as e:
+                skipped += 1
+                if skipped <= MAX_REPORTED_IMPORT_ERRORS:
+                    print(f"Skipping line {line_number}: {e}")
+
+    start_time = time.perf_counter()
+    try:
+        if filename == "-":
+            imported = import_transactions(valid_rows(sys.stdin), args.chunk_size)
+        else:
+            with open(filename, "r", newline="", encoding="utf-8") as file:
+                imported = import_transactions(valid_rows(file), args.chunk_size)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"Error reading {filename}: {e}")
+        return 1
+    elapsed = time.perf_counter() - start_time
+
+    if imported < 0:
+        print("Import failed; no transactions were added.")
+        return 1
+    if skipped > MAX_REPORTED_IMPORT_ERRORS:
+        print(f"... {skipped - MAX_REPORTED_IMPORT_ERRORS} more invalid lines")
+    rate = imported / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Imported {imported:,} transactions ({skipped:,} skipped) "
+        f"in {elapsed:.2f}s ({rate:,.0f} rows/sec)."
     )
-    plt.xticks(rotation=45, ha="right")  # type: ignore
-    plt.tight_layout()
-    plt.show()  # type: ignore
+    return 0
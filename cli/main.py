@@ -1,9 +1,31 @@
 """Holds the CLI for the Budget Tracker."""
 
 import argparse
-from typing import Callable, Optional
+import importlib
+import sys
+from typing import Callable, Optional, Tuple
 from cli.models import TransactionType
-from cli.commands import *
+from db.config import JOURNAL_MODES, SYNCHRONOUS_LEVELS
+from db.db import DEFAULT_IMPORT_CHUNK_SIZE
+
+# Maps each command to the module and function that run it. The module is
+# only imported once the command is chosen, to keep startup fast.
+COMMANDS: dict[str, Tuple[str, str]] = {
+    "add-income": ("cli.commands", "add_income_command"),
+    "add-expense": ("cli.commands", "add_expense_command"),
+    "view-summary": ("cli.commands", "view_summary_command"),
+    "list-categories": ("cli.commands", "list_categories_command"),
+    "get-transaction": ("cli.commands", "get_transaction_command"),
+    "get-transactions": ("cli.commands", "get_transactions_command"),
+    "edit-transaction": ("cli.commands", "edit_transaction_command"),
+    "delete-transaction": ("cli.commands", "delete_transaction_command"),
+    "configure": ("cli.commands", "configure_command"),
+    "export-csv": ("cli.commands", "export_transactions_to_csv_command"),
+    "plot-expenses": ("cli.commands", "plot_expenses_by_category_command"),
+    "import": ("cli.commands", "import_transactions_command"),
+    "rebuild-rollup": ("cli.commands", "rebuild_rollup_command"),
+    "shell": ("cli.shell", "shell_command"),
+}
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -114,6 +136,25 @@ def create_subparsers(parser: argparse.ArgumentParser):
         choices=["asc", "desc"],
         help="Sort order (ascending (default) or descending)",
     )
+    get_transactions_parser.add_argument(
+        "-l",
+        "--limit",
+        type=int,
+        help="Show at most this many transactions per page",
+    )
+    get_transactions_parser.add_argument(
+        "-p",
+        "--page",
+        type=str,
+        help="Show the page starting at this cursor (printed after each page)",
+    )
+    get_transactions_parser.add_argument(
+        "-np",
+        "--no-pager",
+        action="store_const",
+        const=True,
+        help="Print directly instead of through the pager, default is False",
+    )
 
     # Subparser for viewing summary
     view_summary_parser = subparsers.add_parser(
@@ -146,6 +187,11 @@ def create_subparsers(parser: argparse.ArgumentParser):
         help="Show income summary by category, default is False",
     )
 
+    # Subparser for listing categories
+    subparsers.add_parser(
+        "list-categories", help="List the categories and their transaction counts"
+    )
+
     # Subparser for editing a transaction
     edit_transaction_parser = subparsers.add_parser(
         "edit-transaction", help="Edit an existing transaction"
@@ -194,6 +240,50 @@ def create_subparsers(parser: argparse.ArgumentParser):
     configure_parser.add_argument(
         "-c", "--currency-symbol", type=str, help="The currency symbol to use"
     )
+    configure_parser.add_argument(
+        "-ps",
+        "--pool-size",
+        type=int,
+        help="The number of database connections to keep open",
+    )
+    configure_parser.add_argument(
+        "-jm",
+        "--journal-mode",
+        type=str.lower,
+        choices=JOURNAL_MODES,
+        help="The SQLite journal mode (default: wal)",
+    )
+    configure_parser.add_argument(
+        "-sy",
+        "--synchronous",
+        type=str.lower,
+        choices=SYNCHRONOUS_LEVELS,
+        help="The SQLite synchronous level (default: normal)",
+    )
+    configure_parser.add_argument(
+        "-bt",
+        "--busy-timeout",
+        type=int,
+        help="How long to wait for a locked database, in milliseconds",
+    )
+    configure_parser.add_argument(
+        "-gc",
+        "--group-commit",
+        choices=["on", "off"],
+        help="Commit inserts that arrive together in one transaction",
+    )
+    configure_parser.add_argument(
+        "-rc",
+        "--result-cache-size",
+        type=int,
+        help="How many query results to cache in the API (0 disables the cache)",
+    )
+    configure_parser.add_argument(
+        "-mt",
+        "--metrics",
+        choices=["on", "off"],
+        help="Time queries and requests for the API's /metrics endpoint",
+    )
 
     # Subparser for exporting transactions to CSV
     export_csv_subparser = subparsers.add_parser(
@@ -233,42 +323,104 @@ def create_subparsers(parser: argparse.ArgumentParser):
     plot_expenses_parser.add_argument(
         "-m", "--month", type=str, help="Filter expenses by month (YYYY-MM)"
     )
+    plot_expenses_parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="Save the chart to this .png or .svg file instead of showing it",
+    )
+
+    # Subparser for importing transactions
+    import_parser = subparsers.add_parser(
+        "import", help="Import transactions from a CSV or JSON-lines file"
+    )
+    import_parser.add_argument(
+        "-f",
+        "--file",
+        type=str,
+        default="-",
+        help='The file to import, default is "-" (stdin)',
+    )
+    import_parser.add_argument(
+        "-fmt",
+        "--format",
+        type=str,
+        choices=["csv", "jsonl"],
+        help="The file format, default is jsonl for .jsonl/.json files, else csv",
+    )
+    import_parser.add_argument(
+        "-cs",
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_IMPORT_CHUNK_SIZE,
+        help=f"Rows inserted per batch, default is {DEFAULT_IMPORT_CHUNK_SIZE}",
+    )
+
+    # Subparser for verifying/rebuilding the monthly totals rollup
+    rebuild_rollup_parser = subparsers.add_parser(
+        "rebuild-rollup", help="Verify and repair the monthly summary totals"
+    )
+    rebuild_rollup_parser.add_argument(
+        "-v",
+        "--verify",
+        action="store_const",
+        const=True,
+        help="Only check the totals against the transactions, default is False",
+    )
+
+    # Subparser for running many commands in one process
+    shell_parser = subparsers.add_parser(
+        "shell",
+        help="Run commands from a file, stdin or a prompt in one process",
+    )
+    shell_parser.add_argument(
+        "-f",
+        "--file",
+        type=str,
+        help="File of commands, one per line (- for stdin), default is stdin "
+        "or an interactive prompt",
+    )
+    shell_parser.add_argument(
+        "-b",
+        "--batch",
+        action="store_const",
+        const=True,
+        help="Run all the commands in one transaction, default is False",
+    )
 
     return subparsers
 
 
-def main():
-    """Main CLI entry."""
+def get_command(name: str) -> Optional[Callable[[argparse.Namespace], int]]:
+    """Imports and returns the function that runs the named command."""
+    if name not in COMMANDS:
+        return None
+    module_name, function_name = COMMANDS[name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def main() -> int:
+    """Main CLI entry. Returns the exit status of the command run."""
     parser = create_parser()
     _ = create_subparsers(parser)
     args = parser.parse_args()
 
-    command_function: Optional[Callable[[argparse.Namespace], None]] = None
+    command_function: Optional[Callable[[argparse.Namespace], int]] = None
 
     if args.command:
-        command_function = {
-            "add-income": add_income_command,
-            "add-expense": add_expense_command,
-            "view-summary": view_summary_command,
-            "get-transaction": get_transaction_command,
-            "get-transactions": get_transactions_command,
-            "edit-transaction": edit_transaction_command,
-            "delete-transaction": delete_transaction_command,
-            "configure": configure_command,
-            "export-csv": export_transactions_to_csv_command,
-            "plot-expenses": plot_expenses_by_category_command,
-        }.get(args.command)
+        command_function = get_command(args.command)
 
         if command_function:
-            command_function(args)
+            return command_function(args)
         else:
             parser.print_help()
     else:
         parser.print_help()
+    return 0
 
 
 if __name__ == "__main__":
     from db.db import create_transactions_table
 
     create_transactions_table()
-    main()
+    sys.exit(main())
@@ -1,4 +1,49 @@
+import math
+import sys
+from array import array
+from datetime import date
 from enum import Enum
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple, overload
+
+# Amounts are stored as integer minor units (cents) so that sums are exact.
+CENTS_PER_UNIT = 100
+# The range of amounts in cents that SQLite can store as an INTEGER.
+MIN_CENTS = -(2**63)
+MAX_CENTS = 2**63 - 1
+
+# A transaction as stored: (id, date, description, category, amount, type),
+# with the amount in cents.
+TransactionRow = Tuple[int, str, str, str, int, str]
+
+
+def to_cents(amount: float) -> int:
+    """
+    Converts an amount in currency units to integer cents. Raises ValueError
+    if the amount is not finite or too large to store.
+    """
+    cents = amount * CENTS_PER_UNIT
+    if not math.isfinite(cents):
+        raise ValueError(f"Invalid amount: {amount}")
+    rounded = round(cents)
+    if not MIN_CENTS <= rounded <= MAX_CENTS:
+        raise ValueError(f"Amount out of range: {amount}")
+    return rounded
+
+
+def from_cents(cents: int) -> float:
+    """Converts integer cents to an amount in currency units."""
+    return cents / CENTS_PER_UNIT
+
+
+class TransactionRecord(NamedTuple):
+    """A stored transaction row with named fields, without pydantic validation."""
+
+    id: int
+    date: str
+    description: str
+    category: str
+    amount: int
+    type: str
 
 
 class TransactionType(Enum):
@@ -7,3 +52,227 @@ class TransactionType(Enum):
 
     def __str__(self):
         return self.value
+
+
+BATCH_TYPES: Tuple[str, ...] = tuple(str(t) for t in TransactionType)
+BATCH_COLUMNS = (
+    "ids",
+    "dates",
+    "amounts",
+    "types",
+    "category_codes",
+    "description_codes",
+)
+
+
+class StringDictionary:
+    """Stores each distinct string once and maps it to a small integer code."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        """Returns the code for value, adding it if it is new."""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: str) -> Optional[int]:
+        """Returns the code for value, or None if it has not been added."""
+        return self._codes.get(value)
+
+
+class TransactionBatch:
+    """
+    A column-oriented collection of transactions for reports over many rows.
+
+    Ids, dates (as day ordinals), amounts (in cents) and types (as indexes
+    into BATCH_TYPES) are kept in typed arrays, and categories and
+    descriptions are dictionary-encoded, so a row costs a few dozen bytes
+    instead of a model or tuple of Python objects. Row tuples in the
+    database's column order are only built one at a time, when iterating or
+    indexing. Slices and filtered batches share their parent's dictionaries.
+    """
+
+    __slots__ = (*BATCH_COLUMNS, "categories", "descriptions")
+
+    def __init__(
+        self,
+        categories: Optional[StringDictionary] = None,
+        descriptions: Optional[StringDictionary] = None,
+    ) -> None:
+        self.ids = array("q")
+        self.dates = array("l")
+        self.amounts = array("q")
+        self.types = array("B")
+        self.category_codes = array("L")
+        self.description_codes = array("L")
+        self.categories = categories or StringDictionary()
+        self.descriptions = descriptions or StringDictionary()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[TransactionRow]) -> "TransactionBatch":
+        """Builds a batch from rows in the database's column order."""
+        batch = cls()
+        batch.extend(rows)
+        return batch
+
+    def append(self, row: TransactionRow) -> None:
+        """Adds a (id, date, description, category, amount, type) row."""
+        self.extend((row,))
+
+    def extend(self, rows: Iterable[TransactionRow]) -> None:
+        """Adds (id, date, description, category, amount, type) rows."""
+        to_ordinal = date.toordinal
+        from_iso = date.fromisoformat
+        encode_category = self.categories.encode
+        encode_description = self.descriptions.encode
+        type_flags = {value: flag for flag, value in enumerate(BATCH_TYPES)}
+        for transaction_id, day, description, category, amount, type in rows:
+            self.ids.append(transaction_id)
+            self.dates.append(
+                to_ordinal(day if isinstance(day, date) else from_iso(day))
+            )
+            self.description_codes.append(encode_description(description))
+            self.category_codes.append(encode_category(category))
+            self.amounts.append(amount)
+            self.types.append(type_flags[str(type)])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _row(self, index: int) -> TransactionRow:
+        """Builds the row tuple at index."""
+        return (
+            self.ids[index],
+            date.fromordinal(self.dates[index]).isoformat(),
+            self.descriptions.values[self.description_codes[index]],
+            self.categories.values[self.category_codes[index]],
+            self.amounts[index],
+            BATCH_TYPES[self.types[index]],
+        )
+
+    def __iter__(self) -> Iterator[TransactionRow]:
+        from_ordinal = date.fromordinal
+        descriptions = self.descriptions.values
+        categories = self.categories.values
+        for transaction_id, day, description, category, amount, flag in zip(
+            self.ids,
+            self.dates,
+            self.description_codes,
+            self.category_codes,
+            self.amounts,
+            self.types,
+        ):
+            yield (
+                transaction_id,
+                from_ordinal(day).isoformat(),
+                descriptions[description],
+                categories[category],
+                amount,
+                BATCH_TYPES[flag],
+            )
+
+    @overload
+    def __getitem__(self, index: int) -> TransactionRow: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "TransactionBatch": ...
+
+    def __getitem__(self, index: int | slice) -> "TransactionRow | TransactionBatch":
+        if isinstance(index, slice):
+            batch = TransactionBatch(self.categories, self.descriptions)
+            for column in BATCH_COLUMNS:
+                setattr(batch, column, getattr(self, column)[index])
+            return batch
+        return self._row(range(len(self))[index])
+
+    def take(self, indexes: Iterable[int]) -> "TransactionBatch":
+        """Returns a batch of the rows at the given indexes, in that order."""
+        batch = TransactionBatch(self.categories, self.descriptions)
+        indexes = list(indexes)
+        for column in BATCH_COLUMNS:
+            values = getattr(self, column)
+            setattr(batch, column, array(values.typecode, [values[i] for i in indexes]))
+        return batch
+
+    def filter(
+        self,
+        type: Optional[str] = None,
+        category: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> "TransactionBatch":
+        """
+        Returns the rows of the given type and category, dated from
+        start_date to end_date inclusive, comparing the encoded columns.
+        """
+        selected: Iterable[int] = range(len(self))
+        if type is not None:
+            flag = BATCH_TYPES.index(type)
+            selected = [i for i in selected if self.types[i] == flag]
+        if category is not None:
+            code = self.categories.code(category)
+            selected = [i for i in selected if self.category_codes[i] == code]
+        if start_date is not None:
+            start = date.fromisoformat(start_date).toordinal()
+            selected = [i for i in selected if self.dates[i] >= start]
+        if end_date is not None:
+            end = date.fromisoformat(end_date).toordinal()
+            selected = [i for i in selected if self.dates[i] <= end]
+        return self.take(selected)
+
+    def total(self, type: Optional[str] = None) -> int:
+        """Returns the sum of the amounts in cents, optionally of one type only."""
+        if type is None:
+            return sum(self.amounts)
+        flag = BATCH_TYPES.index(type)
+        return sum(
+            amount
+            for amount, row_flag in zip(self.amounts, self.types)
+            if row_flag == flag
+        )
+
+    def totals_by_category(self, type: Optional[str] = None) -> dict[str, int]:
+        """Returns the sum in cents per category, optionally of one type only."""
+        totals = [0] * len(self.categories.values)
+        seen = [False] * len(totals)
+        flag = None if type is None else BATCH_TYPES.index(type)
+        for code, amount, row_flag in zip(
+            self.category_codes, self.amounts, self.types
+        ):
+            if flag is None or row_flag == flag:
+                totals[code] += amount
+                seen[code] = True
+        return {
+            category: total
+            for category, total, used in zip(self.categories.values, totals, seen)
+            if used
+        }
+
+    def longest(self, column: str) -> int:
+        """
+        Returns the length of the longest "description" or "category" in the
+        batch, checking each distinct value once.
+        """
+        dictionary, codes = {
+            "description": (self.descriptions, self.description_codes),
+            "category": (self.categories, self.category_codes),
+        }[column]
+        return max((len(dictionary.values[code]) for code in set(codes)), default=0)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the columns and the distinct strings."""
+        columns = sum(sys.getsizeof(getattr(self, column)) for column in BATCH_COLUMNS)
+        strings = sum(
+            sys.getsizeof(value)
+            for dictionary in (self.categories, self.descriptions)
+            for value in dictionary.values
+        )
+        return columns + strings
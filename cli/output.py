@@ -0,0 +1,141 @@
+"""
+Holds the streaming output helpers for the CLI: a pager for long output and
+a transaction table that is printed as rows are fetched, rather than after
+the whole result has been loaded.
+"""
+
+import itertools
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional, TextIO, Tuple
+
+from cli.models import from_cents
+
+DEFAULT_PAGER = "more" if os.name == "nt" else "less"
+# Column widths are taken from the first rows only, so that the first
+# screen can be printed before the rest of the result is fetched.
+TABLE_SAMPLE_ROWS = 500
+# Longer descriptions and categories are cut short to keep the columns in line.
+MAX_DESCRIPTION_WIDTH = 50
+MAX_CATEGORY_WIDTH = 30
+# Wide enough for amounts up to 9,999,999.99; larger ones push the row over.
+MIN_AMOUNT_WIDTH = 13
+TABLE_CHUNK_ROWS = 200
+
+
+@contextmanager
+def open_output(use_pager: bool = True) -> Iterator[TextIO]:
+    """
+    Yields the stream to write long output to: the input of the user's pager
+    ($PAGER, by default less) when use_pager is set and stdout is a terminal,
+    or stdout otherwise. Stops quietly if the reader goes away early, such as
+    when the pager is quit before the end.
+    """
+    pager = os.environ.get("PAGER", DEFAULT_PAGER).strip()
+    if not (use_pager and sys.stdout.isatty()) or pager in ("", "cat"):
+        try:
+            yield sys.stdout
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # Point stdout at devnull so the flush at exit doesn't fail again.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
+
+    sys.stdout.flush()
+    env = dict(os.environ)
+    # Let less quit when the output fits on one screen and keep it on screen.
+    env.setdefault("LESS", "FRX")
+    try:
+        process = subprocess.Popen(
+            pager, shell=True, stdin=subprocess.PIPE, text=True, env=env
+        )
+    except OSError:
+        yield sys.stdout
+        return
+    assert process.stdin is not None
+    try:
+        yield process.stdin
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        process.wait()
+
+
+def _fit(text: str, width: int) -> str:
+    """Cuts text down to width characters, marking the cut with '...'."""
+    return text if len(text) <= width else text[: width - 3] + "..."
+
+
+def write_transaction_table(
+    rows: Iterable[Tuple[Any, ...]],
+    out: TextIO,
+    currency_symbol: str,
+    limit: Optional[int] = None,
+) -> Tuple[int, Optional[Tuple[Any, ...]], bool]:
+    """
+    Writes (id, date, description, category, amount, type) rows, with the
+    amount in cents, as a table, sizing the columns from the first
+    TABLE_SAMPLE_ROWS rows and writing TABLE_CHUNK_ROWS rows at a time.
+    Stops after limit rows. Returns the number of rows written, the last
+    row written and whether rows had more after it.
+    """
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, TABLE_SAMPLE_ROWS))
+    if not sample:
+        return 0, None, False
+
+    date_width = 10
+    description_width = min(
+        max(len("Description"), *(len(row[2]) for row in sample)),
+        MAX_DESCRIPTION_WIDTH,
+    )
+    category_width = min(
+        max(len("Category"), *(len(row[3]) for row in sample)), MAX_CATEGORY_WIDTH
+    )
+    amount_width = max(
+        MIN_AMOUNT_WIDTH,
+        *(len(format(from_cents(row[4]), ",.2f")) + 1 for row in sample),
+    )
+
+    header = (
+        f" {'Date':<{date_width}} | "
+        f"{'Description':<{description_width}} | "
+        f"{'Category':<{category_width}} | "
+        f"{'Amount':>{amount_width + 1}} | "
+        f"{'Type':<6} "
+    )
+    divider = "-" * len(header)
+    out.write(f"{divider}\n{header}\n{divider}\n")
+
+    written = 0
+    remaining = itertools.chain(sample, rows)
+    if limit is not None:
+        remaining = itertools.islice(remaining, limit + 1)
+    lines: list[str] = []
+    last: Optional[Tuple[Any, ...]] = None
+    for row in remaining:
+        if written == limit:
+            out.write("".join(lines))
+            return written, last, True
+        _, t_date, t_description, t_category, t_amount, t_type = row
+        lines.append(
+            f" {t_date:<{date_width}} | "
+            f"{_fit(t_description, description_width):<{description_width}} | "
+            f"{_fit(t_category, category_width):<{category_width}} | "
+            f"{currency_symbol} "
+            f"{from_cents(t_amount):>{amount_width - 1},.2f} | "
+            f"{t_type.capitalize()}\n"
+        )
+        written += 1
+        last = row
+        if len(lines) >= TABLE_CHUNK_ROWS:
+            out.write("".join(lines))
+            lines.clear()
+    out.write("".join(lines))
+    return written, last, False
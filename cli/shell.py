@@ -0,0 +1,192 @@
+"""
+Holds the shell command, which runs CLI commands read from a file, stdin or
+an interactive prompt in one process, so that the interpreter start,
+imports and database setup are paid once rather than per command.
+"""
+
+import argparse
+import shlex
+import sys
+import time
+from typing import List, Optional, TextIO, Tuple
+
+from cli.main import create_parser, create_subparsers, get_command
+from db.db import run_batch
+
+PROMPT = "budget> "
+EXIT_WORDS = ("exit", "quit")
+# Commands that can't run inside a batch transaction: import and configure
+# manage their own transaction and connection settings.
+NOT_IN_BATCH = ("configure", "import")
+
+
+class ShellError(Exception):
+    """Raised when a shell line can't be run."""
+
+
+def parse_line(
+    parser: argparse.ArgumentParser, line: str
+) -> Optional[argparse.Namespace]:
+    """
+    Parses a line with the CLI's argument parser, as the shell splits it.
+    Returns None for blank and comment lines. Raises ShellError if the line
+    is invalid.
+    """
+    try:
+        words = shlex.split(line, comments=True)
+    except ValueError as e:
+        raise ShellError(str(e))
+    if not words:
+        return None
+    try:
+        args = parser.parse_args(words)
+    except SystemExit as e:
+        # argparse has printed the usage and error (or the help).
+        if e.code:
+            raise ShellError(f"invalid command: {line.strip()}")
+        return None
+    if args.command is None:
+        raise ShellError(f"no command given: {line.strip()}")
+    if args.command == "shell":
+        raise ShellError("the shell can't be started from the shell")
+    return args
+
+
+def run_args(args: argparse.Namespace, check: bool = False) -> None:
+    """
+    Runs a parsed command. Raises ShellError if it fails unexpectedly or,
+    with check set, if it reports that it failed.
+    """
+    command_function = get_command(args.command)
+    if command_function is None:
+        raise ShellError(f"unknown command: {args.command}")
+    try:
+        status = command_function(args)
+    except Exception as e:
+        raise ShellError(f"{args.command} failed: {e}")
+    if check and status:
+        raise ShellError(f"{args.command} failed")
+
+
+def run_interactive(parser: argparse.ArgumentParser) -> None:
+    """Runs commands typed at a prompt until exit or end of input."""
+    try:
+        # Gives input() line editing and history where it is available.
+        import readline  # pylint: disable=unused-import
+    except ImportError:
+        pass
+    print('Budget Tracker shell. Type "help" for commands, "exit" to quit.')
+    while True:
+        try:
+            line = input(PROMPT)
+        except EOFError:
+            print()
+            return
+        except KeyboardInterrupt:
+            print()
+            continue
+        if line.strip() in EXIT_WORDS:
+            return
+        if line.strip() == "help":
+            parser.print_help()
+            continue
+        try:
+            args = parse_line(parser, line)
+            if args is not None:
+                run_args(args)
+        except ShellError as e:
+            print(f"Error: {e}")
+
+
+def run_lines(parser: argparse.ArgumentParser, file: TextIO) -> int:
+    """
+    Runs each command in a script as it is read. Returns the number of
+    lines that failed; the rest still run.
+    """
+    failures = 0
+    for line_number, line in enumerate(file, start=1):
+        if line.strip() in EXIT_WORDS:
+            break
+        try:
+            args = parse_line(parser, line)
+            if args is not None:
+                run_args(args, check=True)
+        except ShellError as e:
+            failures += 1
+            print(f"Error on line {line_number}: {e}")
+    return failures
+
+
+def run_batch_lines(parser: argparse.ArgumentParser, file: TextIO) -> int:
+    """
+    Parses every command in a script, then runs them all in one
+    transaction. Nothing is run if a line is invalid, and nothing is kept if
+    a command fails. Returns the number of lines that failed.
+    """
+    commands: List[Tuple[int, argparse.Namespace]] = []
+    failures = 0
+    for line_number, line in enumerate(file, start=1):
+        if line.strip() in EXIT_WORDS:
+            break
+        try:
+            args = parse_line(parser, line)
+            if args is not None and args.command in NOT_IN_BATCH:
+                raise ShellError(f"{args.command} can't be run in a batch")
+        except ShellError as e:
+            failures += 1
+            print(f"Error on line {line_number}: {e}")
+            continue
+        if args is not None:
+            commands.append((line_number, args))
+    if failures:
+        print("No commands were run.")
+        return failures
+
+    def batch() -> None:
+        for line_number, args in commands:
+            try:
+                run_args(args, check=True)
+            except ShellError as e:
+                raise ShellError(f"line {line_number}: {e}")
+
+    try:
+        run_batch(batch)
+    except ShellError as e:
+        print(f"Error on {e}")
+        print("The batch was rolled back.")
+        return 1
+    except Exception as e:
+        print(f"Error committing the batch: {e}")
+        return 1
+    return 0
+
+
+def shell_command(args: argparse.Namespace) -> int:
+    """
+    Runs CLI commands, one per line in the same syntax as on the command
+    line, from a file, stdin or an interactive prompt. Returns 1 if any line
+    failed, 0 otherwise.
+    """
+    parser = create_parser()
+    create_subparsers(parser)
+
+    filename: Optional[str] = args.file
+    if filename is None and sys.stdin.isatty() and not args.batch:
+        run_interactive(parser)
+        return 0
+
+    run = run_batch_lines if args.batch else run_lines
+    start_time = time.perf_counter()
+    try:
+        if filename is None or filename == "-":
+            failures = run(parser, sys.stdin)
+        else:
+            with open(filename, "r", encoding="utf-8") as file:
+                failures = run(parser, file)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error reading {filename}: {e}")
+        return 1
+    elapsed = time.perf_counter() - start_time
+
+    print(f"Finished in {elapsed:.2f}s with {failures} failed line(s).")
+    return 1 if failures else 0
@@ -0,0 +1,136 @@
+"""
+Holds asynchronous wrappers around the database functions for the API.
+
+The sqlite3 calls in db.db block, so each one is run on a bounded thread
+pool instead of the event loop. The pool has as many workers as the
+connection pool has connections, so a worker never waits for a connection.
+Streamed reads use connections of their own (see db.get_stream_pool), which
+they don't wait for either.
+"""
+
+import asyncio
+import functools
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from api.models import TransactionBase, TransactionResponse
+from db import db
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool that database calls are offloaded to."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=db.get_config()["pool_size"],
+                thread_name_prefix="db",
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """Waits for running database calls and stops the thread pool."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+async def run(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a blocking database function on the thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def iterate(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Iterates a blocking iterator from async code, fetching each item on the
+    thread pool. The iterator is closed if iteration stops early, so a
+    generator holding a database connection gives it back.
+    """
+    sentinel = object()
+    executor = get_executor()
+    pending: Optional[Future] = None
+    try:
+        while True:
+            pending = executor.submit(next, iterator, sentinel)
+            item = await asyncio.wrap_future(pending)
+            if item is sentinel:
+                break
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            if pending is None:
+                close()
+            else:
+                # If we were cancelled mid-fetch, wait for that fetch to
+                # finish before closing, as a running generator can't close.
+                pending.add_done_callback(lambda _: close())
+
+
+async def add_transaction(transaction: TransactionBase) -> int:
+    """
+    Async version of db.add_transaction. Waits on the writer directly rather
+    than holding a worker thread, so with group commit enabled concurrent
+    requests can share a commit.
+    """
+    try:
+        return await asyncio.wrap_future(db.submit_transaction(transaction))
+    except sqlite3.Error as e:
+        print(f"Error adding transaction: {e}")
+        return -1
+
+
+async def add_transactions(
+    transactions: List[TransactionBase], atomic: bool = True
+) -> Tuple[List[Optional[int]], List[Tuple[Optional[int], str]]]:
+    """Async version of db.add_transactions."""
+    return await run(db.add_transactions, transactions, atomic)
+
+
+async def get_transactions(**kwargs: Any) -> List[TransactionResponse]:
+    """Async version of db.get_transactions."""
+    return await run(db.get_transactions, **kwargs)
+
+
+async def get_transactions_page(
+    **kwargs: Any,
+) -> Tuple[List[TransactionResponse], Optional[str]]:
+    """Async version of db.get_transactions_page."""
+    return await run(db.get_transactions_page, **kwargs)
+
+
+async def get_transactions_json(**kwargs: Any) -> Tuple[str, Optional[str]]:
+    """Async version of db.get_transactions_json."""
+    return await run(db.get_transactions_json, **kwargs)
+
+
+async def get_expense_totals(month: Optional[str] = None) -> dict[str, float]:
+    """Async version of db.get_expense_totals."""
+    return await run(db.get_expense_totals, month)
+
+
+async def get_categories() -> List[Tuple[int, str, int]]:
+    """Async version of db.get_categories."""
+    return await run(db.get_categories)
+
+
+async def get_summary(
+    month: Optional[str] = None,
+    year: Optional[str] = None,
+    category: Optional[str] = None,
+) -> dict[str, Any]:
+    """Async version of db.get_summary."""
+    return await run(db.get_summary, month, year, category)
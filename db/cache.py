@@ -0,0 +1,148 @@
+"""
+Holds the in-process cache of query results for the Budget Tracker.
+
+Each cached result records the scope of transactions it was computed from
+(a range of months, and optionally one category and type). Writes report
+the (month, category, type) groups they changed once they commit, and only
+the results whose scope covers one of those groups are dropped. Writes by
+other processes are noticed by the database writer (see DatabaseWriter),
+which clears the whole cache.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Iterable,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+DEFAULT_RESULT_CACHE_SIZE: int = 256
+# Results with more rows than this are not worth the memory to cache.
+MAX_CACHED_ROWS: int = 10000
+
+
+class CacheScope(NamedTuple):
+    """
+    The transactions a cached result depends on: those dated in the months
+    from start_month to end_month inclusive (YYYY-MM, None for no bound) and,
+    when set, of one category and type.
+    """
+
+    start_month: Optional[str] = None
+    end_month: Optional[str] = None
+    category: Optional[str] = None
+    type: Optional[str] = None
+
+    def covers(self, month: str, category: str, type: str) -> bool:
+        """Whether a change to the given group could change the result."""
+        return (
+            (self.start_month is None or month >= self.start_month)
+            and (self.end_month is None or month <= self.end_month)
+            and (self.category is None or category == self.category)
+            and (self.type is None or type == self.type)
+        )
+
+
+# A group of transactions changed by a write: (month, category, type).
+Change = Tuple[str, str, str]
+
+
+class ResultCache:
+    """
+    A thread-safe LRU cache of query results, holding at most max_entries.
+    Cached values are shared, so callers must not modify them.
+    """
+
+    def __init__(
+        self, database_path: str, max_entries: int = DEFAULT_RESULT_CACHE_SIZE
+    ) -> None:
+        self.database_path = database_path
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Tuple[CacheScope, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so that a result computed while a
+        # write committed isn't stored after the write invalidated it.
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        scope: CacheScope,
+        load: Callable[[], T],
+        rows: Callable[[T], int] = len,
+    ) -> T:
+        """
+        Returns the cached result for key, or calls load and caches its
+        result unless it has more than MAX_CACHED_ROWS rows.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+            generation = self._generation
+
+        value = load()
+        if self.max_entries < 1 or rows(value) > MAX_CACHED_ROWS:
+            return value
+        with self._lock:
+            if self._generation == generation:
+                self._entries[key] = (scope, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        return value
+
+    def invalidate(self, changes: Iterable[Change]) -> None:
+        """Drops the results whose scope covers any of the changed groups."""
+        changes = set(changes)
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key
+                for key, (scope, _) in self._entries.items()
+                if any(scope.covers(*change) for change in changes)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self._invalidations += len(stale)
+
+    def clear(self) -> None:
+        """Drops every cached result."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns the number of cached results and the maximum, along with the
+        hits, misses, evictions (to stay within the maximum) and results
+        dropped by writes so far.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
@@ -0,0 +1,100 @@
+"""
+Holds the categories table and the in-process cache of category ids.
+
+Transactions store the integer id of their category rather than its name.
+Categories are never renamed or deleted, so an id, once committed, always
+maps to the same name and the cache never has to be invalidated.
+"""
+
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Iterable, Optional, Tuple
+
+CREATE_CATEGORIES_TABLE = """
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    """
+INSERT_CATEGORY = "INSERT INTO categories (name) VALUES (?)"
+SELECT_CATEGORY_ID = "SELECT id FROM categories WHERE name = ?"
+SELECT_CATEGORIES = "SELECT id, name FROM categories"
+# Matches rows of the named category by its id. An unknown name matches
+# nothing, as the subquery is NULL.
+CATEGORY_FILTER = "category_id = (SELECT id FROM categories WHERE name = ?)"
+
+
+class CategoryCache:
+    """Maps category names to ids and back for one database."""
+
+    def __init__(self, database_path: str) -> None:
+        self.database_path = database_path
+        self._ids: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def get_id(self, name: str) -> Optional[int]:
+        """Returns the id of the named category, or None if it is not cached."""
+        return self._ids.get(name)
+
+    def get_name(self, category_id: int) -> Optional[str]:
+        """Returns the name of the category, or None if it is not cached."""
+        return self._names.get(category_id)
+
+    def add(self, categories: Iterable[Tuple[int, str]]) -> None:
+        """Caches committed (id, name) pairs."""
+        with self._lock:
+            for category_id, name in categories:
+                self._ids[name] = category_id
+                self._names[category_id] = name
+
+    def load(self, conn: sqlite3.Connection) -> None:
+        """Caches every category committed to the database."""
+        self.add(conn.execute(SELECT_CATEGORIES))
+
+    def clear(self) -> None:
+        """Forgets every cached category."""
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class CategoryResolver:
+    """
+    Looks up category ids for one write job, creating missing categories on
+    the job's connection. Categories found or created by the job are only
+    added to the cache once the job has committed, so a rolled back job
+    can't leave an id in the cache that the database doesn't have.
+    """
+
+    def __init__(self, cache: CategoryCache) -> None:
+        self.cache = cache
+        self._found: dict[str, int] = {}
+
+    def resolve(self, conn: sqlite3.Connection, name: str) -> int:
+        """Returns the id of the named category, creating it if needed."""
+        category_id = self.cache.get_id(name)
+        if category_id is None:
+            category_id = self._found.get(name)
+        if category_id is None:
+            row = conn.execute(SELECT_CATEGORY_ID, (name,)).fetchone()
+            if row is not None:
+                category_id = row[0]
+            else:
+                category_id = conn.execute(INSERT_CATEGORY, (name,)).lastrowid
+                if category_id is None:
+                    raise sqlite3.DatabaseError("Could not retrieve lastrowid.")
+            self._found[name] = category_id
+        return category_id
+
+    def on_done(self, future: "Future[Any]") -> None:
+        """
+        Callback for the job's future: caches the categories the job used if
+        it committed.
+        """
+        if not future.cancelled() and future.exception() is None:
+            self.cache.add((id, name) for name, id in self._found.items())
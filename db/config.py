@@ -0,0 +1,139 @@
+"""Holds the cached configuration loading for the Budget Tracker."""
+
+import json
+import os
+import threading
+from typing import Any, Optional, Tuple
+
+from db.cache import DEFAULT_RESULT_CACHE_SIZE
+from db.pool import DEFAULT_POOL_SIZE, DEFAULT_STREAM_POOL_SIZE
+from db.writer import DEFAULT_GROUP_COMMIT_SIZE, DEFAULT_GROUP_COMMIT_WINDOW
+
+CONFIG_FILE = "config.json"
+# When set, this environment variable overrides the db_path in the config file.
+DB_PATH_VARIABLE = "BUDGET_DB_PATH"
+DEFAULT_DATABASE_NAME: str = "budget.db"
+DEFAULT_CURRENCY: str = "$"
+DEFAULT_MAX_BATCH_SIZE: int = 1000
+DEFAULT_JOURNAL_MODE: str = "wal"
+DEFAULT_SYNCHRONOUS: str = "normal"
+DEFAULT_BUSY_TIMEOUT: int = 5000
+DEFAULT_METRICS: bool = True
+JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+SYNCHRONOUS_LEVELS = ("off", "normal", "full", "extra")
+
+_config_cache: Optional[dict[str, Any]] = None
+_config_signature: Optional[Tuple[Optional[Tuple[int, int]], Optional[str]]] = None
+_config_lock = threading.Lock()
+
+
+def _get_signature() -> Tuple[Optional[Tuple[int, int]], Optional[str]]:
+    """
+    Returns the (mtime, size) of the config file, or None if it is missing,
+    along with the database path override from the environment.
+    """
+    try:
+        stat = os.stat(CONFIG_FILE)
+    except OSError:
+        return None, os.environ.get(DB_PATH_VARIABLE)
+    return (stat.st_mtime_ns, stat.st_size), os.environ.get(DB_PATH_VARIABLE)
+
+
+def _load_config(overrides: bool = True) -> dict[str, Any]:
+    """
+    Reads the configuration from a JSON file and fills in defaults, then
+    applies the environment overrides unless overrides is False.
+    """
+    config: dict[str, Any] = {}
+    if os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except json.JSONDecodeError:
+            print(f"Warning: Invalid JSON in {CONFIG_FILE}. Using defaults.")
+    return {
+        "db_path": (os.environ.get(DB_PATH_VARIABLE) if overrides else None)
+        or config.get("db_path", DEFAULT_DATABASE_NAME),
+        "currency_symbol": config.get("currency_symbol", DEFAULT_CURRENCY),
+        "pool_size": int(config.get("pool_size", DEFAULT_POOL_SIZE)),
+        "stream_pool_size": int(
+            config.get("stream_pool_size", DEFAULT_STREAM_POOL_SIZE)
+        ),
+        "max_batch_size": int(config.get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)),
+        "journal_mode": str(config.get("journal_mode", DEFAULT_JOURNAL_MODE)).lower(),
+        "synchronous": str(config.get("synchronous", DEFAULT_SYNCHRONOUS)).lower(),
+        "busy_timeout": int(config.get("busy_timeout", DEFAULT_BUSY_TIMEOUT)),
+        "group_commit": bool(config.get("group_commit", False)),
+        "group_commit_window_ms": float(
+            config.get("group_commit_window_ms", DEFAULT_GROUP_COMMIT_WINDOW * 1000)
+        ),
+        "group_commit_size": int(
+            config.get("group_commit_size", DEFAULT_GROUP_COMMIT_SIZE)
+        ),
+        "result_cache_size": int(
+            config.get("result_cache_size", DEFAULT_RESULT_CACHE_SIZE)
+        ),
+        "metrics": bool(config.get("metrics", DEFAULT_METRICS)),
+    }
+
+
+def get_config() -> dict[str, Any]:
+    """
+    Returns the configuration, re-reading the JSON file only when its
+    modification time or size (or the database path override) has changed
+    since it was last loaded.
+    """
+    global _config_cache, _config_signature
+    signature = _get_signature()
+    with _config_lock:
+        if _config_cache is None or signature != _config_signature:
+            _config_cache = _load_config()
+            _config_signature = signature
+        return dict(_config_cache)
+
+
+def reload_config() -> dict[str, Any]:
+    """Discards the cached configuration and reads it again from disk."""
+    global _config_cache, _config_signature
+    with _config_lock:
+        _config_cache = None
+        _config_signature = None
+    return get_config()
+
+
+def get_file_config() -> dict[str, Any]:
+    """
+    Returns the configuration as the config file sets it, with defaults but
+    without the environment overrides, to be changed and saved again.
+    """
+    with _config_lock:
+        return _load_config(overrides=False)
+
+
+def save_config(config: dict[str, Any]) -> None:
+    """Writes the configuration to the JSON file and refreshes the cache."""
+    with open(CONFIG_FILE, "w", encoding="utf-8") as config_file:
+        json.dump(config, config_file, indent=4)
+    reload_config()
+
+
+def get_connection_pragmas(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Returns the pragmas every connection is opened with: the journal mode,
+    the synchronous level and how long (in ms) to wait on a locked database.
+    Raises ValueError if the journal mode or synchronous level is invalid.
+    """
+    if config["journal_mode"] not in JOURNAL_MODES:
+        raise ValueError(f"Invalid journal_mode: {config["journal_mode"]}")
+    if config["synchronous"] not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Invalid synchronous level: {config["synchronous"]}")
+    return {
+        "journal_mode": config["journal_mode"],
+        "synchronous": config["synchronous"],
+        "busy_timeout": config["busy_timeout"],
+    }
+
+
+def get_database_path() -> str:
+    """Gets the database path from the configuration."""
+    return get_config()["db_path"]
@@ -1,17 +1,92 @@
 """Holds the database functions for the Budget Tracker."""
 
+import atexit
+import base64
+import binascii
+import itertools
 import json
-import os
 import sqlite3
-from typing import Optional, Tuple, List, Any
-from api.models import TransactionBase, TransactionResponse
-from cli.models import TransactionType
+import threading
+from concurrent.futures import Future
+from datetime import date, timedelta
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from cli.models import (
+    TransactionBatch,
+    TransactionRecord,
+    TransactionType,
+    from_cents,
+    to_cents,
+)
+from db.cache import CacheScope, Change, ResultCache
+from db.categories import (
+    CATEGORY_FILTER,
+    CREATE_CATEGORIES_TABLE,
+    CategoryCache,
+    CategoryResolver,
+)
+from db.config import (
+    get_config,
+    get_connection_pragmas,
+    get_database_path,
+    reload_config,
+    save_config,
+)
+from db.metrics import connection_factory
+from db.migrations import SCHEMA_VERSION, migrate, set_schema_version
+from db.pool import DEFAULT_POOL_TIMEOUT, ConnectionPool
+from db.writer import DatabaseWriter, WriteJob
+from utils.util import get_date_range
 
-CONFIG_FILE = "config.json"
-DEFAULT_DATABASE_NAME: str = "budget.db"
-DEFAULT_CURRENCY: str = "$"
+if TYPE_CHECKING:
+    # The pydantic models are only imported where they are built, so that the
+    # CLI can use the database without paying for importing pydantic.
+    from api.models import TransactionBase, TransactionResponse
+
+T = TypeVar("T")
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_stream_pool: Optional[ConnectionPool] = None
+_stream_pool_lock = threading.Lock()
+# The pool each connection borrowed through connect() came from, by id, as
+# the pool may be replaced (see get_pool) before the connection is returned.
+_borrowed: dict[int, ConnectionPool] = {}
+_borrowed_lock = threading.Lock()
+_writer: Optional[DatabaseWriter] = None
+_writer_lock = threading.Lock()
+_categories: Optional[CategoryCache] = None
+_categories_lock = threading.Lock()
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
 
 SEED_DATA_FILE: str = "seed_data.json"
+DEFAULT_FETCH_SIZE: int = 1000
+DEFAULT_PAGE_SIZE: int = 100
+MAX_PAGE_SIZE: int = 1000
+DEFAULT_IMPORT_CHUNK_SIZE: int = 10000
+# Settings applied to the connection for the duration of a bulk import.
+IMPORT_PRAGMAS: dict[str, Any] = {
+    "synchronous": 0,  # OFF
+    "cache_size": -65536,  # 64 MiB
+    "temp_store": 2,  # MEMORY
+}
+ORDER_BY_COLUMNS: dict[str, str] = {
+    "date": "date",
+    "desc": "description",
+    "cat": "category",
+    "amt": "amount",
+    "type": "type",
+}
 SELECT_TRANSACTIONS_TABLE = """
     SELECT name FROM sqlite_master WHERE type='table' AND name='transactions';
     """
@@ -20,139 +95,766 @@ CREATE_TRANSACTIONS_TABLE = """
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         date TEXT NOT NULL,
         description TEXT NOT NULL,
-        category TEXT NOT NULL,
-        amount REAL NOT NULL,
+        category_id INTEGER NOT NULL REFERENCES categories (id),
+        amount INTEGER NOT NULL, -- cents
         type TEXT NOT NULL CHECK(type IN ('income', 'expense'))
     )
     """
+# Transactions with their category's name, in the column order of
+# TransactionRecord followed by category_id. Reads go through this view so
+# they see names while filtering on the integer category_id.
+CREATE_TRANSACTION_DETAILS_VIEW = """
+    CREATE VIEW IF NOT EXISTS transaction_details AS
+    SELECT t.id, t.date, t.description, c.name AS category, t.amount, t.type,
+        t.category_id
+    FROM transactions t
+    JOIN categories c ON c.id = t.category_id
+    """
+# The same rows, but joined with the categories as the outer loop (CROSS JOIN
+# fixes SQLite's join order), so rows ordered by category name and then id
+# are read in that order from the category name and category_id indexes
+# instead of being sorted. Pages ordered by category read through this.
+CREATE_TRANSACTIONS_BY_CATEGORY_VIEW = """
+    CREATE VIEW IF NOT EXISTS transactions_by_category AS
+    SELECT t.id, t.date, t.description, c.name AS category, t.amount, t.type,
+        t.category_id
+    FROM categories c
+    CROSS JOIN transactions t ON t.category_id = c.id
+    """
+TRANSACTION_COLUMNS = "id, date, description, category, amount, type"
 INSERT_TRANSACTION = """
-    INSERT INTO transactions (date, description, category, amount, type)
+    INSERT INTO transactions (date, description, category_id, amount, type)
     VALUES (?, ?, ?, ?, ?)
     """
-GET_TRANSACTION = "SELECT * FROM transactions WHERE id = ?"
-GET_TRANSACTIONS = "SELECT * FROM transactions"
+SELECT_TRANSACTIONS_SEQUENCE = (
+    "SELECT seq FROM sqlite_sequence WHERE name = 'transactions'"
+)
+GET_TRANSACTION = f"SELECT {TRANSACTION_COLUMNS} FROM transaction_details WHERE id = ?"
+# The (month, category, type) group of a transaction, for cache invalidation.
+GET_TRANSACTION_GROUP = """
+    SELECT substr(date, 1, 7), category, type FROM transaction_details WHERE id = ?
+    """
+GET_TRANSACTIONS = f"SELECT {TRANSACTION_COLUMNS} FROM transaction_details"
+# Each row as a JSON object in the same shape as TransactionResponse, with the
+# amount converted from cents as in from_cents.
+GET_TRANSACTIONS_JSON = """
+    SELECT json_object(
+        'date', date, 'description', description, 'category', category,
+        'amount', amount / 100.0, 'type', type, 'id', id
+    )
+    FROM transaction_details"""
 DELETE_TRANSACTION = "DELETE FROM transactions WHERE id = ?"
+UPDATE_TRANSACTION = """
+    UPDATE transactions
+    SET date = ?, description = ?, category_id = ?, amount = ?, type = ?
+    WHERE id = ?
+    """
+TRANSACTIONS_INDEX_NAMES = [
+    "idx_transactions_date",
+    "idx_transactions_type_date",
+    "idx_transactions_category_date",
+    "idx_transactions_description",
+    "idx_transactions_amount",
+    "idx_transactions_type",
+    "idx_transactions_category",
+]
+# Every index ends with the rowid, which is the id, so the single-column ones
+# hold rows in the (column, id) order of a page for each ORDER_BY_COLUMNS
+# entry (category pages walk the categories by name, then this by id).
+CREATE_TRANSACTIONS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)",
+    """
+    CREATE INDEX IF NOT EXISTS idx_transactions_type_date
+    ON transactions (type, date)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_transactions_category_date
+    ON transactions (category_id, date)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_transactions_description
+    ON transactions (description)
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_transactions_amount ON transactions (amount)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (type)",
+    """
+    CREATE INDEX IF NOT EXISTS idx_transactions_category
+    ON transactions (category_id)
+    """,
+]
+SELECT_MONTHLY_TOTALS_TABLE = """
+    SELECT name FROM sqlite_master WHERE type='table' AND name='monthly_totals';
+    """
+CREATE_MONTHLY_TOTALS_TABLE = """
+    CREATE TABLE IF NOT EXISTS monthly_totals (
+        month TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        total INTEGER NOT NULL, -- cents
+        count INTEGER NOT NULL,
+        PRIMARY KEY (month, category_id, type)
+    ) WITHOUT ROWID
+    """
+# Keep monthly_totals in sync with every insert, update and delete on
+# transactions, so summaries never have to scan the raw rows.
+CREATE_MONTHLY_TOTALS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_insert_totals
+    AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO monthly_totals (month, category_id, type, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.category_id, NEW.type, NEW.amount, 1)
+        ON CONFLICT (month, category_id, type) DO UPDATE
+        SET total = total + excluded.total, count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_delete_totals
+    AFTER DELETE ON transactions
+    BEGIN
+        UPDATE monthly_totals
+        SET total = total - OLD.amount, count = count - 1
+        WHERE month = substr(OLD.date, 1, 7)
+            AND category_id = OLD.category_id
+            AND type = OLD.type;
+        DELETE FROM monthly_totals
+        WHERE month = substr(OLD.date, 1, 7)
+            AND category_id = OLD.category_id
+            AND type = OLD.type
+            AND count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_update_totals
+    AFTER UPDATE OF date, category_id, amount, type ON transactions
+    BEGIN
+        UPDATE monthly_totals
+        SET total = total - OLD.amount, count = count - 1
+        WHERE month = substr(OLD.date, 1, 7)
+            AND category_id = OLD.category_id
+            AND type = OLD.type;
+        DELETE FROM monthly_totals
+        WHERE month = substr(OLD.date, 1, 7)
+            AND category_id = OLD.category_id
+            AND type = OLD.type
+            AND count <= 0;
+        INSERT INTO monthly_totals (month, category_id, type, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.category_id, NEW.type, NEW.amount, 1)
+        ON CONFLICT (month, category_id, type) DO UPDATE
+        SET total = total + excluded.total, count = count + 1;
+    END
+    """,
+]
+MONTHLY_TOTALS_TRIGGER_NAMES = [
+    "trg_transactions_insert_totals",
+    "trg_transactions_delete_totals",
+    "trg_transactions_update_totals",
+]
+AGGREGATE_MONTHLY_TOTALS = """
+    SELECT substr(date, 1, 7) AS month, category_id, type, SUM(amount), COUNT(*)
+    FROM transactions
+    GROUP BY month, category_id, type
+    """
+# Adds the transactions after a given id to the rollup in one pass.
+MERGE_MONTHLY_TOTALS = """
+    INSERT INTO monthly_totals (month, category_id, type, total, count)
+    SELECT substr(date, 1, 7) AS month, category_id, type, SUM(amount), COUNT(*)
+    FROM transactions
+    WHERE id > ?
+    GROUP BY month, category_id, type
+    ON CONFLICT (month, category_id, type) DO UPDATE
+    SET total = total + excluded.total, count = count + excluded.count
+    """
+# Groups whose stored totals differ from the raw transactions, in either
+# direction (missing, extra, or different total/count).
+VERIFY_MONTHLY_TOTALS = f"""
+    WITH expected (month, category_id, type, total, count) AS (
+        {AGGREGATE_MONTHLY_TOTALS}
+    )
+    SELECT e.month, e.category_id, e.type
+    FROM expected e
+    LEFT JOIN monthly_totals m
+        ON m.month = e.month AND m.category_id = e.category_id AND m.type = e.type
+    WHERE m.month IS NULL
+        OR m.count != e.count
+        OR m.total != e.total
+    UNION ALL
+    SELECT m.month, m.category_id, m.type
+    FROM monthly_totals m
+    LEFT JOIN expected e
+        ON m.month = e.month AND m.category_id = e.category_id AND m.type = e.type
+    WHERE e.month IS NULL
+    """
+# Each category with its number of transactions, counted from the rollup.
+GET_CATEGORIES = """
+    SELECT c.id, c.name, COALESCE(SUM(m.count), 0)
+    FROM categories c
+    LEFT JOIN monthly_totals m ON m.category_id = c.id
+    GROUP BY c.id
+    ORDER BY c.name
+    """
 
 
-def get_config() -> dict[str, str]:
-    """Reads the configuration from a JSON file or returns defaults."""
-    config: dict[str, str] = {}
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                config = json.load(f)
-        except json.JSONDecodeError:
-            print(f"Warning: Invalid JSON in {CONFIG_FILE}. Using defaults.")
+def _configured_pool(
+    pool: Optional[ConnectionPool], size: int, timeout: float
+) -> ConnectionPool:
+    """
+    Returns pool if it is open and still matches the configured database
+    path, pragmas and metrics setting and the given size, or else closes it
+    and returns a new pool.
+    """
+    config = get_config()
+    database_path = config["db_path"]
+    pragmas = get_connection_pragmas(config)
+    factory = connection_factory(config["metrics"])
+    if (
+        pool is not None
+        and not pool.closed
+        and pool.database_path == database_path
+        and pool.size == size
+        and pool.pragmas == pragmas
+        and pool.factory is factory
+    ):
+        return pool
+    if pool is not None:
+        pool.close()
+    return ConnectionPool(
+        database_path, size=size, timeout=timeout, pragmas=pragmas, factory=factory
+    )
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the connection pool for the configured database, replacing it if
+    the database path, pool size, pragmas or metrics setting have changed
+    since it was created.
+    """
+    global _pool
+    pool_size = get_config()["pool_size"]
+    with _pool_lock:
+        _pool = _configured_pool(_pool, pool_size, DEFAULT_POOL_TIMEOUT)
+        return _pool
+
+
+def get_stream_pool() -> ConnectionPool:
+    """
+    Returns the pool of connections for streamed reads (see iter_transactions),
+    which are kept apart from the main pool so that slow downloads can't take
+    every connection. It doesn't wait: when all of its connections are in use,
+    acquire raises PoolTimeoutError straight away.
+    """
+    global _stream_pool
+    pool_size = get_config()["stream_pool_size"]
+    with _stream_pool_lock:
+        _stream_pool = _configured_pool(_stream_pool, pool_size, 0)
+        return _stream_pool
+
+
+def close_pool() -> None:
+    """Closes all pooled connections. Called on application shutdown."""
+    global _pool, _stream_pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+    with _stream_pool_lock:
+        if _stream_pool is not None:
+            _stream_pool.close()
+            _stream_pool = None
+
+
+def get_writer() -> DatabaseWriter:
+    """
+    Returns the writer that every write to the configured database goes
+    through, replacing it if the database path, pragmas, group commit
+    settings or metrics setting have changed.
+    """
+    global _writer
+    config = get_config()
+    database_path = config["db_path"]
+    pragmas = get_connection_pragmas(config)
+    group_window = config["group_commit_window_ms"] / 1000
+    group_size = config["group_commit_size"] if config["group_commit"] else 1
+    factory = connection_factory(config["metrics"])
+    with _writer_lock:
+        if (
+            _writer is None
+            or _writer.closed
+            or _writer.database_path != database_path
+            or _writer.pragmas != pragmas
+            or _writer.group_window != group_window
+            or _writer.group_size != group_size
+            or _writer.factory is not factory
+        ):
+            if _writer is not None:
+                _writer.close()
+            _writer = DatabaseWriter(
+                database_path,
+                pragmas=pragmas,
+                group_window=group_window,
+                group_size=group_size,
+                on_external_change=clear_result_cache,
+                factory=factory,
+            )
+            # Writes made before the new writer started watching are unseen.
+            clear_result_cache()
+        return _writer
+
+
+def close_writer() -> None:
+    """Finishes queued writes and stops the writer. Called on shutdown."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+
+# Let queued writes finish and checkpoint the WAL when the process exits.
+atexit.register(close_writer)
+
+
+def write(
+    job: WriteJob[T],
+    groupable: bool = False,
+    on_commit: Optional[Callable[[T], None]] = None,
+) -> T:
+    """
+    Runs a write job on the writer's connection and returns its result. The
+    writer commits when the job returns and rolls back if it raises. A
+    groupable job may be committed together with others (see DatabaseWriter).
+    on_commit is called with the result after the commit.
+    """
+    return get_writer().execute(job, groupable, on_commit)
+
+
+def run_batch(batch: Callable[[], T]) -> T:
+    """
+    Calls batch, which may make any number of database calls, as one write
+    job: its writes share one transaction, which is committed when it
+    returns and rolled back if it raises, and its reads see its uncommitted
+    writes. Other writes wait until the batch is done.
+    """
+
+    def job(conn: sqlite3.Connection) -> T:
+        conn.execute("BEGIN IMMEDIATE")
+        return batch()
+
+    try:
+        return write(job)
+    except BaseException:
+        # The batch's writes cached the categories they created as they ran.
+        get_category_cache().clear()
+        raise
+
+
+def _job_connection() -> Optional[sqlite3.Connection]:
+    """Returns the writer's connection when called from a write job."""
+    writer = _writer
+    return writer.job_connection() if writer is not None else None
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Returns the query result cache for the configured database, replacing it
+    if the database path or cache size has changed.
+    """
+    global _result_cache
+    config = get_config()
+    database_path = config["db_path"]
+    max_entries = config["result_cache_size"]
+    with _result_cache_lock:
+        if (
+            _result_cache is None
+            or _result_cache.database_path != database_path
+            or _result_cache.max_entries != max_entries
+        ):
+            _result_cache = ResultCache(database_path, max_entries)
+        return _result_cache
+
+
+def clear_result_cache() -> None:
+    """Drops every cached query result."""
+    cache = _result_cache
+    if cache is not None:
+        cache.clear()
+
+
+def invalidate_results(changes: Iterable[Change]) -> None:
+    """
+    Drops the cached query results that a committed write to the given
+    (month, category, type) groups could have changed.
+    """
+    cache = _result_cache
+    if cache is not None:
+        cache.invalidate(changes)
+
+
+def cached_read(
+    key: Tuple[Any, ...],
+    scope: CacheScope,
+    load: Callable[[], T],
+    rows: Callable[[T], int] = len,
+) -> T:
+    """
+    Returns the cached result of a read, or runs load and caches its result.
+    load must raise rather than return a placeholder on errors, so that
+    failures aren't cached.
+    """
+    cache = get_result_cache()
+    # A read in a write job may see uncommitted writes, so don't cache it.
+    if cache.max_entries < 1 or _job_connection() is not None:
+        return load()
+    # The writer watches for writes by other processes, which clear the cache.
+    get_writer().start()
+    return cache.get_or_load(key, scope, load, rows)
+
+
+def get_data_version() -> str:
+    """
+    Returns a token that changes whenever the data does, without running a
+    query: the writer's instance id and version. Writes by other processes
+    are seen within the writer's watch interval.
+    """
+    writer = get_writer()
+    writer.start()
+    return f"{writer.instance_id}.{writer.version}"
+
+
+def get_stats() -> dict[str, Any]:
+    """Returns the result cache, writer and connection pool statistics."""
     return {
-        "db_path": config.get("db_path", DEFAULT_DATABASE_NAME),
-        "currency_symbol": config.get("currency_symbol", DEFAULT_CURRENCY),
+        "result_cache": get_result_cache().stats(),
+        "writer": get_writer().stats(),
+        "pool": get_pool().stats(),
+        "stream_pool": get_stream_pool().stats(),
     }
 
 
-def get_database_path() -> str:
-    """Gets the database path from the configuration."""
-    config = get_config()
-    return config.get("db_path", DEFAULT_DATABASE_NAME)
+def _row_change(row: Tuple[Any, ...]) -> Change:
+    """Returns the group of a (date, description, category, amount, type) row."""
+    return row[0][:7], row[2], str(row[4])
+
+
+def get_category_cache() -> CategoryCache:
+    """
+    Returns the category id cache for the configured database, replacing it
+    if the database path has changed.
+    """
+    global _categories
+    database_path = get_config()["db_path"]
+    with _categories_lock:
+        if _categories is None or _categories.database_path != database_path:
+            _categories = CategoryCache(database_path)
+        return _categories
+
+
+def submit_with_categories(
+    job: Callable[[sqlite3.Connection, CategoryResolver], T],
+    groupable: bool = False,
+    on_commit: Optional[Callable[[T], None]] = None,
+) -> "Future[T]":
+    """
+    Queues a write job that stores category ids, passing it a resolver that
+    looks up (or creates) the id for a category name. The categories the job
+    used are cached once it commits.
+    """
+    resolver = CategoryResolver(get_category_cache())
+    future = get_writer().submit(
+        lambda conn: job(conn, resolver), groupable, on_commit
+    )
+    future.add_done_callback(resolver.on_done)
+    return future
 
 
 def connect() -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
-    """Connects to the SQLite database."""
-    database_path = get_database_path()
-    conn = sqlite3.connect(database_path)
+    """
+    Borrows a connection to the SQLite database from the pool, or uses the
+    writer's connection when called from a write job (see run_batch).
+    """
+    conn = _job_connection()
+    if conn is None:
+        pool = get_pool()
+        conn = pool.acquire()
+        with _borrowed_lock:
+            _borrowed[id(conn)] = pool
     return conn, conn.cursor()
 
 
 def close(conn: sqlite3.Connection) -> None:
-    """Closes the database connection."""
-    if conn:
-        conn.close()
+    """
+    Returns a borrowed database connection to the pool it came from, which
+    closes it if the pool has since been closed.
+    """
+    if conn and conn is not _job_connection():
+        with _borrowed_lock:
+            pool = _borrowed.pop(id(conn), None)
+        if pool is not None:
+            pool.release(conn)
+        else:
+            conn.close()
 
 
 def create_transactions_table() -> bool:
     """
-    Creates the transaction table if it doesn't exist. Returns True if the
-    transaction table exists or is successfully created; False otherwise.
+    Migrates an existing database to the current schema version, then
+    creates the transaction and category tables, the transaction_details
+    and transactions_by_category views, the indexes and the monthly_totals
+    rollup if they don't exist.
+    Returns True if the transaction table exists or is successfully created;
+    False otherwise.
     """
-    conn, cursor = connect()
-    try:
+
+    def create_tables(conn: sqlite3.Connection) -> None:
+        cursor = conn.cursor()
         cursor.execute(SELECT_TRANSACTIONS_TABLE)
         table_exists = cursor.fetchone() is not None
 
+        cursor.execute(CREATE_CATEGORIES_TABLE)
         if not table_exists:
             cursor.execute(CREATE_TRANSACTIONS_TABLE)
-            conn.commit()
+            set_schema_version(conn, SCHEMA_VERSION)
             print("Transactions table created.")
+        cursor.execute(CREATE_TRANSACTION_DETAILS_VIEW)
+        cursor.execute(CREATE_TRANSACTIONS_BY_CATEGORY_VIEW)
+        for create_index in CREATE_TRANSACTIONS_INDEXES:
+            cursor.execute(create_index)
+
+        cursor.execute(SELECT_MONTHLY_TOTALS_TABLE)
+        totals_exist = cursor.fetchone() is not None
+        cursor.execute(CREATE_MONTHLY_TOTALS_TABLE)
+        for create_trigger in CREATE_MONTHLY_TOTALS_TRIGGERS:
+            cursor.execute(create_trigger)
+        if not totals_exist:
+            # Backfill the rollup for databases created before it existed or
+            # migrated since (which drops it).
+            cursor.execute(f"INSERT INTO monthly_totals {AGGREGATE_MONTHLY_TOTALS}")
+
+    try:
+        migrate(write)
+    except sqlite3.Error as e:
+        print(f"Error migrating the database: {e}")
+        return False
+    try:
+        write(create_tables)
+        # The database may have been replaced or migrated since these were
+        # cached.
+        get_category_cache().clear()
+        clear_result_cache()
         return True
     except sqlite3.Error as e:
         print(f"Error creating transactions table: {e}")
         return False
-    finally:
-        close(conn)
 
 
-def add_transaction(transaction: TransactionBase) -> int:
+def _category_id_row(
+    conn: sqlite3.Connection, categories: CategoryResolver, row: Tuple[Any, ...]
+) -> Tuple[Any, ...]:
+    """
+    Returns a (date, description, category, amount, type) row with the
+    category name replaced by its id.
+    """
+    transaction_date, description, category, amount, transaction_type = row
+    category_id = categories.resolve(conn, category)
+    return transaction_date, description, category_id, amount, transaction_type
+
+
+def _insert_transaction(
+    conn: sqlite3.Connection,
+    categories: CategoryResolver,
+    transaction: "TransactionBase",
+) -> int:
+    """Inserts a transaction on the given connection and returns its ID."""
+    row = _category_id_row(conn, categories, transaction.to_row())
+    cursor = conn.execute(INSERT_TRANSACTION, row)
+    transaction_id: Optional[int] = cursor.lastrowid
+    if transaction_id is None:
+        raise sqlite3.DatabaseError("Could not retrieve lastrowid.")
+    return transaction_id
+
+
+def submit_transaction(transaction: "TransactionBase") -> "Future[int]":
+    """
+    Queues a transaction to be added and returns a future for its ID. When
+    group commit is enabled, inserts queued close together share a commit.
+    """
+    change = _row_change(transaction.to_row())
+    return submit_with_categories(
+        lambda conn, categories: _insert_transaction(conn, categories, transaction),
+        groupable=True,
+        on_commit=lambda _: invalidate_results((change,)),
+    )
+
+
+def add_transaction(transaction: "TransactionBase") -> int:
     """
     Adds a new transaction to the database. Returns the ID if the add
     was successful; -1 otherwise.
     """
-    conn, cursor = connect()
     try:
-        cursor.execute(
-            INSERT_TRANSACTION,
-            (list(transaction.model_dump().values())),
-        )
-        conn.commit()
-        transaction_id: Optional[int] = cursor.lastrowid
-        if transaction_id is None:
-            print("Error: Could not retrieve lastrowid.")
-            conn.rollback()
-            return -1
-        return transaction_id
+        return submit_transaction(transaction).result()
     except sqlite3.Error as e:
         print(f"Error adding transaction: {e}")
-        conn.rollback()
         return -1
-    finally:
-        close(conn)
+
+
+def add_transactions(
+    transactions: List["TransactionBase"], atomic: bool = True
+) -> Tuple[List[Optional[int]], List[Tuple[Optional[int], str]]]:
+    """
+    Adds many transactions in a single database transaction. Returns the ID
+    assigned to each transaction (None where it was not added) and a list of
+    (index, error) pairs.
+
+    If atomic is True, the rows are inserted with executemany and either all
+    of them are added or none are; the index of the failing row is not known,
+    so the error's index is None. Otherwise each row is inserted on its own
+    and rows that fail are reported individually while the rest are added.
+    """
+    ids: List[Optional[int]] = [None] * len(transactions)
+    errors: List[Tuple[Optional[int], str]] = []
+    if not transactions:
+        return ids, errors
+
+    rows = [transaction.to_row() for transaction in transactions]
+
+    def insert_rows(conn: sqlite3.Connection, categories: CategoryResolver) -> None:
+        cursor = conn.cursor()
+        if atomic:
+            # Hold the write lock so the AUTOINCREMENT ids are consecutive.
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(SELECT_TRANSACTIONS_SEQUENCE)
+            row = cursor.fetchone()
+            last_id: int = row[0] if row else 0
+            cursor.executemany(
+                INSERT_TRANSACTION,
+                [_category_id_row(conn, categories, row) for row in rows],
+            )
+            cursor.execute(SELECT_TRANSACTIONS_SEQUENCE)
+            if cursor.fetchone()[0] != last_id + len(rows):
+                raise sqlite3.DatabaseError("Could not determine the assigned ids.")
+            ids[:] = range(last_id + 1, last_id + len(rows) + 1)
+        else:
+            for index, row in enumerate(rows):
+                try:
+                    cursor.execute(
+                        INSERT_TRANSACTION, _category_id_row(conn, categories, row)
+                    )
+                    ids[index] = cursor.lastrowid
+                except sqlite3.IntegrityError as e:
+                    # Only the failed statement is undone; keep the others.
+                    errors.append((index, str(e)))
+
+    changes = {_row_change(row) for row in rows}
+    try:
+        submit_with_categories(
+            insert_rows, on_commit=lambda _: invalidate_results(changes)
+        ).result()
+        return ids, errors
+    except sqlite3.Error as e:
+        print(f"Error adding transactions: {e}")
+        return [None] * len(transactions), [(None, str(e))]
 
 
 def get_transaction(transaction_id: int) -> Optional[Tuple[Any, ...]]:
     """Retrieves a single transaction by its ID."""
     conn, cursor = connect()
-    cursor.execute(GET_TRANSACTION, (transaction_id,))
-    transaction: Optional[Tuple[Any, ...]] = cursor.fetchone()
-    close(conn)
-    return transaction
+    try:
+        cursor.execute(GET_TRANSACTION, (transaction_id,))
+        transaction: Optional[Tuple[Any, ...]] = cursor.fetchone()
+        return transaction
+    finally:
+        close(conn)
 
 
-def get_transactions_by_filters(
+def _period_ranges(
+    month: Optional[str] = None, year: Optional[str] = None
+) -> List[Tuple[str, str]]:
+    """
+    Returns the half-open [start, end) date ranges selected by the month and
+    year filters. Raises ValueError if the month or year is invalid.
+    """
+    ranges: List[Tuple[str, str]] = []
+    if month:
+        # month is either YYYY-MM or MM alongside a separate year
+        month_year, month_number = month.split("-") if "-" in month else (year, month)
+        if not month_year:
+            raise ValueError("a year is required to filter by month")
+        ranges.append(get_date_range(month_year, month_number))
+    if year:
+        ranges.append(get_date_range(year))
+    return ranges
+
+
+def _period_scope(
     month: Optional[str] = None,
     year: Optional[str] = None,
     category: Optional[str] = None,
-) -> List[Tuple[Any, ...]]:
-    """Retrieves transactions based on optional month, year, and category filters."""
-    conn, cursor = connect()
+) -> CacheScope:
+    """
+    Returns the cache scope of a read with the month, year and category
+    filters. Raises ValueError if the month or year is invalid.
+    """
+    ranges = _period_ranges(month, year)
+    # The ranges end on the first day of the month after the last one.
+    last_months = [
+        (date.fromisoformat(end_date) - timedelta(days=1)).isoformat()[:7]
+        for _, end_date in ranges
+    ]
+    return CacheScope(
+        start_month=max((start_date[:7] for start_date, _ in ranges), default=None),
+        end_month=min(last_months, default=None),
+        category=category or None,
+    )
+
+
+def _build_period_filters(
+    month: Optional[str] = None,
+    year: Optional[str] = None,
+    category: Optional[str] = None,
+    monthly: bool = False,
+) -> Tuple[List[str], List[str]]:
+    """
+    Builds the WHERE conditions and parameters for the month, year and
+    category filters, against the date column of transactions or, if
+    monthly is True, the YYYY-MM month column of monthly_totals. Raises
+    ValueError if the month or year is invalid.
+    """
     conditions: List[str] = []
     params: List[str] = []
 
-    if month:
-        conditions.append("strftime('%Y-%m', date) = ?")
-        if year:
-            month = f"{year}-{month}"
-        params.append(month)
-    if year:
-        conditions.append("strftime('%Y', date) = ?")
-        params.append(year)
+    for start_date, end_date in _period_ranges(month, year):
+        if monthly:
+            conditions.append("month >= ? AND month < ?")
+            params.extend((start_date[:7], end_date[:7]))
+        else:
+            conditions.append("date >= ? AND date < ?")
+            params.extend((start_date, end_date))
     if category:
-        conditions.append("category = ?")
+        conditions.append(CATEGORY_FILTER)
         params.append(category)
+    return conditions, params
+
+
+def get_transactions_by_filters(
+    month: Optional[str] = None,
+    year: Optional[str] = None,
+    category: Optional[str] = None,
+) -> List[Tuple[Any, ...]]:
+    """Retrieves transactions based on optional month, year, and category filters."""
+    try:
+        conditions, params = _build_period_filters(month, year, category)
+    except ValueError as e:
+        print(f"Error: Invalid month or year filter: {e}")
+        return []
 
     where_clause = ""
     if conditions:
         where_clause = "WHERE " + " AND ".join(conditions)
 
-    sql = f"SELECT * FROM transactions {where_clause}"
+    sql = f"SELECT {TRANSACTION_COLUMNS} FROM transaction_details {where_clause}"
 
+    conn, cursor = connect()
     try:
         cursor.execute(sql, params)
         transactions: List[Tuple[Any, ...]] = cursor.fetchall()
@@ -164,20 +866,45 @@ def get_transactions_by_filters(
         close(conn)
 
 
-def get_transactions(
+def encode_cursor(order_value: Any, transaction_id: int) -> str:
+    """Encodes the sort value and ID of the last row on a page as a cursor."""
+    payload = json.dumps([order_value, transaction_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Decodes a pagination cursor. Raises ValueError if it is malformed."""
+    try:
+        order_value, transaction_id = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError(f"Invalid pagination cursor: {cursor}")
+    if not isinstance(transaction_id, int):
+        raise ValueError(f"Invalid pagination cursor: {cursor}")
+    return order_value, transaction_id
+
+
+def _build_transactions_query(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     category: Optional[str] = None,
     order_by: Optional[str] = None,
     order_direction: Optional[str] = None,
     type: Optional[str] = None,
-) -> List[TransactionResponse]:
-    """Retrieves transactions from the database with optional filtering."""
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    select: str = GET_TRANSACTIONS,
+) -> Tuple[str, List[Any]]:
+    """
+    Builds the query (select plus filters) and parameters shared by the
+    transaction readers.
+    When paginating (limit or after), rows are ordered by the order_by column
+    and then by ID, and after is a cursor from a previous page; the next page
+    is found with a keyset comparison so deep pages cost the same as the first.
+    """
 
-    conn, cursor = connect()
-    query = GET_TRANSACTIONS
+    query = select
     conditions: List[str] = []
-    params: List[str] = []
+    params: List[Any] = []
 
     if start_date:
         conditions.append("date >= ?")
@@ -186,115 +913,522 @@ def get_transactions(
         conditions.append("date <= ?")
         params.append(end_date)
     if category:
-        conditions.append("category = ?")
+        conditions.append(CATEGORY_FILTER)
         params.append(category)
     if type:
         conditions.append("type = ?")
         params.append(type)
 
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-
+    order_column: Optional[str] = None
     if order_by:
-        match order_by:
-            case "date":
-                pass
-            case "desc":
-                order_by = "description"
-            case "cat":
-                order_by = "category"
-            case "amt":
-                order_by = "amount"
-            case "type":
-                pass
-            case _:
-                raise ValueError(f"Invalid order_by column: {order_by}")
-        query += f" ORDER BY {order_by}"
+        order_column = ORDER_BY_COLUMNS.get(order_by)
+        if order_column is None:
+            raise ValueError(f"Invalid order_by column: {order_by}")
 
+    direction = ""
     if order_direction:
         if order_direction.upper() not in ("ASC", "DESC"):
             raise ValueError(f"Invalid order_direction: {order_direction}")
-        query += f" {order_direction.upper()}"
+        direction = order_direction.upper()
 
-    try:
-        cursor.execute(query, params)
-        transactions: List[Tuple[Any, ...]] = cursor.fetchall()
+    paginate = limit is not None or after is not None
+    if after:
+        order_value, last_id = decode_cursor(after)
+        comparison = "<" if direction == "DESC" else ">"
+        if order_column:
+            conditions.append(f"({order_column}, id) {comparison} (?, ?)")
+            params.extend((order_value, last_id))
+        else:
+            conditions.append(f"id {comparison} ?")
+            params.append(last_id)
 
-        result: list[TransactionResponse] = []
-        for transaction in transactions:
-            transaction_dict = {
-                "id": transaction[0],
-                "date": transaction[1],
-                "description": transaction[2],
-                "category": transaction[3],
-                "amount": transaction[4],
-                "type": transaction[5],
-            }
-            result.append(TransactionResponse(**transaction_dict))
-        return result
+    if paginate and order_column == "category":
+        query = query.replace(
+            "FROM transaction_details", "FROM transactions_by_category"
+        )
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+
+    if paginate:
+        # The ID breaks ties so that every row has a unique position.
+        order_terms = [order_column, "id"] if order_column else ["id"]
+        query += " ORDER BY " + ", ".join(
+            f"{term} {direction}".rstrip() for term in order_terms
+        )
+    elif order_column or direction:
+        query += f" ORDER BY {order_column or 'id'} {direction}".rstrip()
+
+    if limit is not None:
+        if limit < 1:
+            raise ValueError(f"Invalid limit: {limit}")
+        query += " LIMIT ?"
+        params.append(limit)
+
+    return query, params
+
+
+def _transactions_scope(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    type: Optional[str] = None,
+) -> CacheScope:
+    """Returns the cache scope of a read with the get_transactions filters."""
+    return CacheScope(
+        start_month=start_date[:7] if start_date else None,
+        end_month=end_date[:7] if end_date else None,
+        category=category or None,
+        type=type or None,
+    )
+
+
+def transaction_record(_: sqlite3.Cursor, row: Tuple[Any, ...]) -> TransactionRecord:
+    """Row factory that returns transaction rows as TransactionRecord tuples."""
+    return TransactionRecord(*row)
+
+
+def get_transaction_records(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    order_by: Optional[str] = None,
+    order_direction: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+) -> List[TransactionRecord]:
+    """
+    Retrieves transactions with the same filtering as get_transactions, as
+    lightweight TransactionRecord tuples that skip pydantic validation.
+    """
+
+    query, params = _build_transactions_query(
+        start_date, end_date, category, order_by, order_direction, type, limit, after
+    )
+
+    def load() -> List[TransactionRecord]:
+        conn, cursor = connect()
+        try:
+            cursor.row_factory = transaction_record
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            close(conn)
+
+    try:
+        scope = _transactions_scope(start_date, end_date, category, type)
+        return list(cached_read(("records", query, *params), scope, load))
     except sqlite3.Error as e:
         print(f"Error retrieving transactions: {e}")
         return []
+
+
+def get_transactions(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    order_by: Optional[str] = None,
+    order_direction: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+) -> List["TransactionResponse"]:
+    """
+    Retrieves transactions from the database with optional filtering,
+    optionally limited to one page of at most limit rows following the
+    after cursor.
+    """
+
+    from api.models import TransactionResponse
+
+    records = get_transaction_records(
+        start_date, end_date, category, order_by, order_direction, type, limit, after
+    )
+    return [TransactionResponse.from_row(record) for record in records]
+
+
+def _next_cursor(order_by: Optional[str], last: dict[str, Any]) -> str:
+    """
+    Returns the cursor for the page after the given last transaction, whose
+    values must be as stored (the amount in cents).
+    """
+    order_value: Any = None
+    if order_by:
+        order_value = last[ORDER_BY_COLUMNS[order_by]]
+    return encode_cursor(order_value, last["id"])
+
+
+def next_page_cursor(order_by: Optional[str], row: Tuple[Any, ...]) -> str:
+    """
+    Returns the cursor for the page after a stored (id, date, description,
+    category, amount, type) row, such as one from iter_transactions.
+    """
+    return _next_cursor(order_by, dict(zip(TransactionRecord._fields, row)))
+
+
+def get_transactions_page(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    order_by: Optional[str] = None,
+    order_direction: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+) -> Tuple[List["TransactionResponse"], Optional[str]]:
+    """
+    Retrieves one page of transactions and the cursor for the next page,
+    which is None when there are no more transactions.
+    """
+
+    from api.models import TransactionResponse
+
+    records = get_transaction_records(
+        start_date,
+        end_date,
+        category,
+        order_by,
+        order_direction,
+        type,
+        limit=limit + 1,
+        after=after,
+    )
+    next_cursor: Optional[str] = None
+    if len(records) > limit:
+        del records[limit:]
+        next_cursor = _next_cursor(order_by, records[-1]._asdict())
+    return [TransactionResponse.from_row(record) for record in records], next_cursor
+
+
+def get_transactions_json(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    order_by: Optional[str] = None,
+    order_direction: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+) -> Tuple[str, Optional[str]]:
+    """
+    Retrieves transactions as a JSON array in the same shape as a list of
+    TransactionResponse, along with the cursor for the next page when limit
+    is given and there are more transactions. SQLite builds each row's JSON
+    object, so no Python objects are created per row.
+    """
+
+    query, params = _build_transactions_query(
+        start_date,
+        end_date,
+        category,
+        order_by,
+        order_direction,
+        type,
+        None if limit is None else limit + 1,
+        after,
+        select=GET_TRANSACTIONS_JSON,
+    )
+
+    def load() -> Tuple[str, Optional[str], int]:
+        conn, cursor = connect()
+        try:
+            cursor.execute(query, params)
+            rows: List[str] = [row[0] for row in cursor]
+        finally:
+            close(conn)
+
+        next_cursor: Optional[str] = None
+        if limit is not None and len(rows) > limit:
+            del rows[limit:]
+            last = json.loads(rows[-1])
+            last["amount"] = to_cents(last["amount"])
+            next_cursor = _next_cursor(order_by, last)
+        return "[" + ",".join(rows) + "]", next_cursor, len(rows)
+
+    try:
+        scope = _transactions_scope(start_date, end_date, category, type)
+        content, next_cursor, _ = cached_read(
+            ("json", query, *params), scope, load, rows=lambda result: result[2]
+        )
+        return content, next_cursor
+    except sqlite3.Error as e:
+        print(f"Error retrieving transactions: {e}")
+        return "[]", None
+
+
+def iter_transactions(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    order_by: Optional[str] = None,
+    order_direction: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    chunk_size: int = DEFAULT_FETCH_SIZE,
+    stream: bool = False,
+) -> Iterator[Tuple[Any, ...]]:
+    """
+    Returns an iterator over transaction rows with the same filtering as
+    get_transactions, fetching them from the cursor chunk_size rows at a time
+    so the full result is never held in memory.
+
+    The query is checked and run before this returns, so invalid filters
+    raise ValueError and a failed query raises sqlite3.Error here rather than
+    partway through iteration; errors while fetching propagate from the
+    iterator. The pooled connection is kept until the iterator is exhausted
+    or closed. With stream, for iterators consumed at a client's pace, the
+    connection comes from the stream pool (see get_stream_pool), raising
+    PoolTimeoutError if it has none free.
+    """
+
+    query, params = _build_transactions_query(
+        start_date, end_date, category, order_by, order_direction, type, limit, after
+    )
+
+    if stream:
+        pool = get_stream_pool()
+        conn = pool.acquire()
+        cursor = conn.cursor()
+        release: Callable[[sqlite3.Connection], None] = pool.release
+    else:
+        conn, cursor = connect()
+        release = close
+    try:
+        cursor.execute(query, params)
+    except sqlite3.Error:
+        release(conn)
+        raise
+    rows = _fetch_rows(conn, cursor, chunk_size, release)
+    # Start the generator so that closing it before it is iterated still
+    # runs its finally block and gives the connection back.
+    next(rows)
+    return rows
+
+
+def _fetch_rows(
+    conn: sqlite3.Connection,
+    cursor: sqlite3.Cursor,
+    chunk_size: int,
+    release: Callable[[sqlite3.Connection], None],
+) -> Iterator[Any]:
+    """
+    Yields the rows of an executed cursor, after first yielding None (see
+    iter_transactions), and releases its connection when done.
+    """
+    try:
+        yield None
+        while rows := cursor.fetchmany(chunk_size):
+            yield from rows
     finally:
-        close(conn)
+        release(conn)
 
 
-def get_summary(month: Optional[str] = None) -> dict[str, float]:
-    """Calculates the total income, total expenses, and net balance."""
+def get_transaction_batch(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    order_by: Optional[str] = None,
+    order_direction: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+) -> Tuple[TransactionBatch, Optional[str]]:
+    """
+    Retrieves transactions into a columnar TransactionBatch, streaming rows
+    from the cursor so no per-row objects are kept, along with the cursor
+    for the next page when limit is given and there are more transactions.
+    """
 
-    conn, cursor = connect()
-    income_query = "SELECT SUM(amount) FROM transactions WHERE type = 'income'"
-    expense_query = "SELECT SUM(amount) FROM transactions WHERE type = 'expense'"
-    params: List[str] = []
+    rows = iter_transactions(
+        start_date,
+        end_date,
+        category,
+        order_by,
+        order_direction,
+        type,
+        None if limit is None else limit + 1,
+        after,
+    )
+    batch = TransactionBatch.from_rows(rows)
+    if limit is None or len(batch) <= limit:
+        return batch, None
 
-    if month:
-        income_query += " AND strftime('%Y-%m', date) = ?"
-        expense_query += " AND strftime('%Y-%m', date) = ?"
-        params.append(month)
+    batch = batch[:limit]
+    return batch, next_page_cursor(order_by, batch[-1])
 
+
+def get_category_totals(
+    month: Optional[str] = None,
+    year: Optional[str] = None,
+    category: Optional[str] = None,
+) -> List[Tuple[str, str, int, int]]:
+    """
+    Returns the total amount (in cents) and number of transactions per type
+    and category, as (type, category, total, count) tuples, with the filters
+    as get_transactions_by_filters. Reads the monthly_totals rollup, so the
+    cost depends on the number of months and categories, not transactions.
+    Category names are looked up in the category cache.
+    """
     try:
-        cursor.execute(income_query, params)
-        total_income = cursor.fetchone()[0] or 0.0
+        conditions, params = _build_period_filters(
+            month, year, category, monthly=True
+        )
+        scope = _period_scope(month, year, category)
+    except ValueError as e:
+        print(f"Error: Invalid month or year filter: {e}")
+        return []
+
+    where_clause = ""
+    if conditions:
+        where_clause = "WHERE " + " AND ".join(conditions)
 
-        cursor.execute(expense_query, params)
-        total_expenses = cursor.fetchone()[0] or 0.0
+    sql = f"""
+        SELECT type, category_id, SUM(total), SUM(count)
+        FROM monthly_totals {where_clause}
+        GROUP BY type, category_id
+        """
 
-        net_balance = total_income - total_expenses
+    def load() -> List[Tuple[str, str, int, int]]:
+        conn, cursor = connect()
+        try:
+            cursor.execute(sql, params)
+            rows: List[Tuple[str, int, int, int]] = cursor.fetchall()
+            categories = get_category_cache()
+            if any(categories.get_name(row[1]) is None for row in rows):
+                categories.load(conn)
+        finally:
+            close(conn)
+        totals = [
+            (transaction_type, categories.get_name(category_id) or "", total, count)
+            for transaction_type, category_id, total, count in rows
+        ]
+        totals.sort(key=lambda row: row[1])
+        return totals
 
-        return {
-            "total_income": round(total_income, 2),
-            "total_expenses": round(total_expenses, 2),
-            "net_balance": round(net_balance, 2),
-        }
+    try:
+        return list(cached_read(("category_totals", sql, *params), scope, load))
     except sqlite3.Error as e:
-        print(f"Error retrieving transactions: {e}")
-        return {}
+        print(f"Error retrieving category totals: {e}")
+        return []
+
+
+def get_expense_totals(month: Optional[str] = None) -> dict[str, float]:
+    """
+    Returns the total expenses (in currency units) per category, optionally
+    for one month (YYYY-MM), from get_category_totals.
+    """
+    return {
+        category: from_cents(total)
+        for transaction_type, category, total, _ in get_category_totals(month=month)
+        if transaction_type == str(TransactionType.EXPENSE)
+    }
+
+
+def get_categories() -> List[Tuple[int, str, int]]:
+    """
+    Returns every category as an (id, name, count) tuple, ordered by name,
+    where count is its number of transactions (possibly 0).
+    """
+    conn, cursor = connect()
+    try:
+        cursor.execute(GET_CATEGORIES)
+        categories: List[Tuple[int, str, int]] = cursor.fetchall()
+        get_category_cache().add((id, name) for id, name, _ in categories)
+        return categories
+    except sqlite3.Error as e:
+        print(f"Error retrieving categories: {e}")
+        return []
     finally:
         close(conn)
 
 
-def update_transaction(transaction_id: int, transaction: TransactionBase) -> bool:
-    """Updates an existing transaction in the database."""
+def get_summary(
+    month: Optional[str] = None,
+    year: Optional[str] = None,
+    category: Optional[str] = None,
+) -> dict[str, Any]:
+    """
+    Calculates the total income, total expenses, and net balance, along with
+    the income and expense totals per category. The sums are exact, as they
+    are taken over integer cents and only converted at the end.
+    """
+    total_income: int = 0
+    total_expenses: int = 0
+    income_by_category: dict[str, float] = {}
+    expenses_by_category: dict[str, float] = {}
+    for transaction_type, transaction_category, total, _ in get_category_totals(
+        month, year, category
+    ):
+        if transaction_type == str(TransactionType.INCOME):
+            total_income += total
+            income_by_category[transaction_category] = from_cents(total)
+        elif transaction_type == str(TransactionType.EXPENSE):
+            total_expenses += total
+            expenses_by_category[transaction_category] = from_cents(total)
+
+    net_balance = total_income - total_expenses
+
+    return {
+        "total_income": from_cents(total_income),
+        "total_expenses": from_cents(total_expenses),
+        "net_balance": from_cents(net_balance),
+        "income_by_category": income_by_category,
+        "expenses_by_category": expenses_by_category,
+    }
+
+
+def rebuild_monthly_totals() -> bool:
+    """Recomputes the monthly_totals rollup from the transactions table."""
+
+    def rebuild(conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM monthly_totals")
+        conn.execute(f"INSERT INTO monthly_totals {AGGREGATE_MONTHLY_TOTALS}")
+
+    try:
+        write(rebuild, on_commit=lambda _: clear_result_cache())
+        return True
+    except sqlite3.Error as e:
+        print(f"Error rebuilding monthly totals: {e}")
+        return False
+
+
+def verify_monthly_totals() -> int:
+    """
+    Compares the monthly_totals rollup against the transactions table.
+    Returns the number of (month, category, type) groups that are out of
+    sync, or -1 if the check could not be run.
+    """
     conn, cursor = connect()
     try:
-        cursor.execute(
-            """
-            UPDATE transactions
-            SET date = ?, description = ?, category = ?, amount = ?, type = ?
-            WHERE id = ?
-            """,
-            (*list(transaction.model_dump().values()), transaction_id),
-        )
-        conn.commit()
+        cursor.execute(VERIFY_MONTHLY_TOTALS)
+        return len(cursor.fetchall())
+    except sqlite3.Error as e:
+        print(f"Error verifying monthly totals: {e}")
+        return -1
+    finally:
         close(conn)
+
+
+def update_transaction(transaction_id: int, transaction: "TransactionBase") -> bool:
+    """Updates an existing transaction in the database."""
+    row = transaction.to_row()
+    changes = [_row_change(row)]
+
+    def update(conn: sqlite3.Connection, categories: CategoryResolver) -> None:
+        changes.extend(conn.execute(GET_TRANSACTION_GROUP, (transaction_id,)))
+        params = (*_category_id_row(conn, categories, row), transaction_id)
+        conn.execute(UPDATE_TRANSACTION, params)
+
+    try:
+        submit_with_categories(
+            update, on_commit=lambda _: invalidate_results(changes)
+        ).result()
         return True
     except sqlite3.Error as e:
         print(f"Error updating transaction: {e}")
-        conn.rollback()
         return False
-    finally:
-        if conn:
-            close(conn)
 
 
 def delete_transaction(transaction_id: int) -> bool:
@@ -302,65 +1436,145 @@ def delete_transaction(transaction_id: int) -> bool:
     Deletes a transaction by its ID.
     Returns True if successful, False otherwise.
     """
-    conn, cursor = connect()
+    changes: List[Change] = []
+
+    def delete(conn: sqlite3.Connection) -> int:
+        changes.extend(conn.execute(GET_TRANSACTION_GROUP, (transaction_id,)))
+        return conn.execute(DELETE_TRANSACTION, (transaction_id,)).rowcount
+
     try:
-        cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-        conn.commit()
-        return cursor.rowcount > 0  # rowcount > 0 indicates a row was deleted
+        deleted = write(delete, on_commit=lambda _: invalidate_results(changes))
+        return deleted > 0  # rowcount > 0 indicates a row was deleted
     except sqlite3.Error as e:
         print(f"Error deleting transaction: {e}")
-        conn.rollback()
         return False
-    finally:
-        close(conn)
 
 
 def delete_all_transactions() -> bool:
     """Deletes all transactions from the database."""
-    conn, cursor = connect()
+
+    # Categories are kept, so that ids cached by other processes stay valid.
+    def delete_all(conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM transactions")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name='transactions'")
+
     try:
-        cursor.execute("DELETE FROM transactions")
-        cursor.execute("DELETE FROM sqlite_sequence WHERE name='transactions'")
-        conn.commit()
+        write(delete_all, on_commit=lambda _: clear_result_cache())
         return True
     except sqlite3.Error as e:
         print(f"Error deleting transactions: {e}")
-        conn.rollback()
         return False
-    finally:
-        close(conn)
+
+
+def import_transactions(
+    rows: Iterable[Tuple[Any, ...]], chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE
+) -> int:
+    """
+    Bulk loads (date, description, category, amount, type) rows, with the
+    amount in cents, in a single transaction using chunked executemany calls.
+    Returns the number of rows imported, or -1 if the import failed and was
+    rolled back.
+
+    During the load, durability is relaxed (synchronous=OFF, larger page
+    cache) and the monthly_totals triggers are replaced by one aggregate
+    merge of the new rows at the end, instead of one upsert per row. When
+    the table starts out empty, its indexes are also rebuilt after the load.
+    """
+
+    def load(conn: sqlite3.Connection, categories: CategoryResolver) -> int:
+        cursor = conn.cursor()
+        saved_pragmas: dict[str, Any] = {}
+        try:
+            for pragma, value in IMPORT_PRAGMAS.items():
+                saved_pragmas[pragma] = cursor.execute(f"PRAGMA {pragma}").fetchone()[0]
+                cursor.execute(f"PRAGMA {pragma} = {value}")
+
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(SELECT_TRANSACTIONS_SEQUENCE)
+            row = cursor.fetchone()
+            last_id: int = row[0] if row else 0
+            for trigger in MONTHLY_TOTALS_TRIGGER_NAMES:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            # Loading into an empty table is faster with the indexes built
+            # once at the end than maintained row by row.
+            cursor.execute("SELECT 1 FROM transactions LIMIT 1")
+            rebuild_indexes = cursor.fetchone() is None
+            if rebuild_indexes:
+                for index in TRANSACTIONS_INDEX_NAMES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+            imported = 0
+            iterator = iter(rows)
+            while chunk := list(itertools.islice(iterator, chunk_size)):
+                category_ids = {
+                    category: categories.resolve(conn, category)
+                    for category in {row[2] for row in chunk}
+                }
+                cursor.executemany(
+                    INSERT_TRANSACTION,
+                    [
+                        (day, description, category_ids[category], amount, kind)
+                        for day, description, category, amount, kind in chunk
+                    ],
+                )
+                imported += len(chunk)
+
+            if rebuild_indexes:
+                for create_index in CREATE_TRANSACTIONS_INDEXES:
+                    cursor.execute(create_index)
+            cursor.execute(MERGE_MONTHLY_TOTALS, (last_id,))
+            for create_trigger in CREATE_MONTHLY_TOTALS_TRIGGERS:
+                cursor.execute(create_trigger)
+            # Commit here, as the pragmas can't be changed inside a transaction.
+            conn.commit()
+            return imported
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            for pragma, value in saved_pragmas.items():
+                cursor.execute(f"PRAGMA {pragma} = {value}")
+
+    try:
+        # A bulk load touches too many groups to track, so drop everything.
+        return submit_with_categories(
+            load, on_commit=lambda _: clear_result_cache()
+        ).result()
+    except sqlite3.Error as e:
+        print(f"Error importing transactions: {e}")
+        return -1
 
 
 def seed() -> bool:
     """Reads sample transactions from a JSON file and populates the database."""
 
-    conn: sqlite3.Connection | None = None
+    def insert_seed_data(
+        conn: sqlite3.Connection, categories: CategoryResolver
+    ) -> None:
+        cursor = conn.cursor()
+        for transaction in transactions:
+            try:
+                transaction_type = TransactionType(transaction["type"])
+                cursor.execute(
+                    INSERT_TRANSACTION,
+                    (
+                        transaction["date"],
+                        transaction["description"],
+                        categories.resolve(conn, transaction["category"]),
+                        to_cents(transaction["amount"]),
+                        str(transaction_type),
+                    ),
+                )
+            except ValueError as e:
+                print(
+                    f"Warning: Invalid transaction type '{transaction["type"]}' in JSON: {e}"
+                )
+
     try:
         with open(SEED_DATA_FILE, "r", encoding="utf-8") as f:
             transactions = json.load(f)
-            conn, cursor = connect()
-            for transaction in transactions:
-                try:
-                    transaction_type = TransactionType(transaction["type"])
-                    cursor.execute(
-                        """
-                        INSERT INTO transactions (date, description, category, amount, type)
-                        VALUES (?, ?, ?, ?, ?)
-                        """,
-                        (
-                            transaction["date"],
-                            transaction["description"],
-                            transaction["category"],
-                            transaction["amount"],
-                            str(transaction_type),
-                        ),
-                    )
-                except ValueError as e:
-                    print(
-                        f"Warning: Invalid transaction type '{transaction["type"]}' in JSON: {e}"
-                    )
-            conn.commit()
-            close(conn)
+        submit_with_categories(
+            insert_seed_data, on_commit=lambda _: clear_result_cache()
+        ).result()
         print(f"Database seeded with {len(transactions)} sample transactions.")
         return True
     except FileNotFoundError:
@@ -371,12 +1585,7 @@ def seed() -> bool:
         return False
     except sqlite3.Error as e:
         print(f"Error seeding database: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            close(conn)
 
 
 if __name__ == "__main__":
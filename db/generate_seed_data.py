@@ -1,12 +1,246 @@
-from collections import defaultdict
+"""
+Generates seed data for the Budget Tracker: random transactions over a date
+range, with two salary deposits in every month.
+
+Rows are generated with NumPy a batch at a time, in date order, so ledgers
+of millions of rows can be written to a SQLite database, a JSON-lines or CSV
+file (in the format the import command reads) or the seed_data.json that
+seed() loads. Run with `python -m db.generate_seed_data`.
+"""
+
+import argparse
+import csv
+import functools
+import itertools
 import json
-import random
+import os
+import time
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Union
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from db.config import DB_PATH_VARIABLE
+
+DEFAULT_CATEGORIES = [
+    "Salary",
+    "Rent",
+    "Groceries",
+    "Utilities",
+    "Entertainment",
+    "Transportation",
+    "Freelance Income",
+    "Food",
+    "Shopping",
+    "Investment Income",
+    "Health",
+    "Education",
+    "Gifts",
+    "Travel",
+    "Bonus",
+    "Other Income",
+    "Other Expense",
+]
+DEFAULT_START_DATE = "2024-01-01"
+DEFAULT_END_DATE = "2025-04-30"
+DEFAULT_ROWS = 500
+DEFAULT_SEED = 0
+DEFAULT_BATCH_SIZE = 100_000
+OUTPUT_FORMATS = ("sqlite", "jsonl", "csv", "json")
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+SALARY_CATEGORY = "Salary"
+SALARY_DESCRIPTION = "Salary Deposit"
+SALARIES_PER_MONTH = 2
+INCOME_KEYWORDS = ["salary", "deposit", "freelance", "investment", "bonus", "gift"]
+EXPENSE_KEYWORDS = [
+    "grocery",
+    "rent",
+    "bill",
+    "shopping",
+    "food",
+    "entertainment",
+    "transport",
+    "payment",
+    "subscription",
+]
+DESCRIPTION_SUFFIXES = ["", " payment", " purchase", " deposit", " fee"]
+# The share of descriptions that get one of the suffixes.
+SUFFIX_CHANCE = 0.6
+# Amount ranges in cents, from the lowest up to but not including the highest.
+SALARY_AMOUNTS = (150_000, 500_001)
+INCOME_AMOUNTS = (5_000, 100_001)
+EXPENSE_AMOUNTS = (100, 150_001)
+
+Row = Tuple[str, str, str, int, str]
+
+
+def _category_type(category: str) -> Optional[str]:
+    """
+    Returns the type a category's transactions always have, judged by its
+    name, or None if they can be either.
+    """
+    if any(keyword in category.lower() for keyword in INCOME_KEYWORDS):
+        return "income"
+    if any(keyword in category.lower() for keyword in EXPENSE_KEYWORDS):
+        return "expense"
+    return None
+
+
+def _description(category: str, keyword: str, suffix: str) -> str:
+    """Returns a transaction description, such as "Groceries Grocery fee"."""
+    return category.capitalize() + " " + (keyword + suffix).capitalize().strip()
+
+
+def _salary_days(
+    start_date: date, end_date: date, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Returns the sorted day numbers (counted from start_date) of
+    SALARIES_PER_MONTH salaries in each month of the range, each on a random
+    day of its month that falls within the range.
+    """
+    days: List[np.ndarray] = []
+    month_start = start_date.replace(day=1)
+    while month_start <= end_date:
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        first = max(month_start, start_date) - start_date
+        last = min(next_month - timedelta(days=1), end_date) - start_date
+        days.append(rng.integers(first.days, last.days + 1, SALARIES_PER_MONTH))
+        month_start = next_month
+    return np.sort(np.concatenate(days))
+
+
+def generate_seed_batches(
+    start_date_str: str,
+    end_date_str: str,
+    num_rows: int,
+    categories: List[str],
+    seed: Optional[int] = DEFAULT_SEED,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[List[Row]]:
+    """
+    Generates seed transactions as batches of (date, description, category,
+    amount, type) rows, with the amount in cents, in date order.
+
+    Every month gets two salaries; the rest of the num_rows rows are spread
+    evenly over the range, in the other categories. A category's type is
+    judged from its name (e.g. "income", "rent") or picked at random. The
+    same seed and batch size always give the same rows.
+    Raises ValueError if the dates are invalid or there are no categories
+    other than the salary one.
+    """
+    start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    if end_date < start_date:
+        raise ValueError("The end date is before the start date.")
+    other_categories = [c for c in categories if c != SALARY_CATEGORY]
+    if not other_categories:
+        raise ValueError(f"At least one category besides {SALARY_CATEGORY} is needed.")
+    rng = np.random.default_rng(seed)
+
+    day_count = (end_date - start_date).days + 1
+    day_names = np.array(
+        [(start_date + timedelta(days=day)).isoformat() for day in range(day_count)],
+        dtype=object,
+    )
+    salary_days = _salary_days(start_date, end_date, rng)
+    # How many of the other transactions land on each day.
+    day_rows = rng.multinomial(
+        max(num_rows - len(salary_days), 0), np.full(day_count, 1 / day_count)
+    )
+
+    # Every description a category, type, keyword and suffix can give, so
+    # that each row's description is picked by index rather than built.
+    keywords = (EXPENSE_KEYWORDS, INCOME_KEYWORDS)
+    keyword_slots = max(len(EXPENSE_KEYWORDS), len(INCOME_KEYWORDS))
+    suffix_slots = len(DESCRIPTION_SUFFIXES) + 1
+    descriptions = np.empty(
+        (len(other_categories), 2, keyword_slots, suffix_slots), dtype=object
+    )
+    for c, category in enumerate(other_categories):
+        for t, type_keywords in enumerate(keywords):
+            for k, keyword in enumerate(type_keywords):
+                descriptions[c, t, k, 0] = _description(category, keyword, "")
+                for s, suffix in enumerate(DESCRIPTION_SUFFIXES, start=1):
+                    descriptions[c, t, k, s] = _description(category, keyword, suffix)
+    # 1 for income, 0 for expense, -1 for either.
+    category_types = np.array(
+        [
+            {"income": 1, "expense": 0, None: -1}[_category_type(category)]
+            for category in other_categories
+        ]
+    )
+    category_names = np.array(other_categories, dtype=object)
+    type_names = np.array(["expense", "income"], dtype=object)
+    keyword_counts = np.array([len(EXPENSE_KEYWORDS), len(INCOME_KEYWORDS)])
+    amount_lows = np.array([EXPENSE_AMOUNTS[0], INCOME_AMOUNTS[0]])
+    amount_highs = np.array([EXPENSE_AMOUNTS[1], INCOME_AMOUNTS[1]])
+
+    # Each batch covers whole days, so batches follow each other in date order.
+    total_rows = np.cumsum(day_rows + np.bincount(salary_days, minlength=day_count))
+    first_day = 0
+    while first_day < day_count:
+        rows_before = total_rows[first_day - 1] if first_day else 0
+        end_day = int(
+            np.searchsorted(total_rows, rows_before + batch_size, side="right")
+        )
+        end_day = min(max(end_day, first_day + 1), day_count)
+
+        days = np.repeat(np.arange(first_day, end_day), day_rows[first_day:end_day])
+        count = len(days)
+        category_ids = rng.integers(0, len(other_categories), count)
+        types = category_types[category_ids]
+        either = types < 0
+        types[either] = rng.integers(0, 2, int(either.sum()))
+        keyword_ids = (rng.random(count) * keyword_counts[types]).astype(np.int64)
+        suffix_ids = np.where(
+            rng.random(count) < SUFFIX_CHANCE,
+            rng.integers(1, suffix_slots, count),
+            0,
+        )
+        amounts = rng.integers(amount_lows[types], amount_highs[types])
+
+        salaries = salary_days[(salary_days >= first_day) & (salary_days < end_day)]
+        salary_amounts = rng.integers(*SALARY_AMOUNTS, len(salaries))
+        order = np.argsort(np.concatenate([salaries, days]), kind="stable")
+        batch_days = np.concatenate([salaries, days])[order]
+        batch_descriptions = np.concatenate(
+            [
+                np.full(len(salaries), SALARY_DESCRIPTION, dtype=object),
+                descriptions[category_ids, types, keyword_ids, suffix_ids],
+            ]
+        )[order]
+        batch_categories = np.concatenate(
+            [
+                np.full(len(salaries), SALARY_CATEGORY, dtype=object),
+                category_names[category_ids],
+            ]
+        )[order]
+        batch_amounts = np.concatenate([salary_amounts, amounts])[order]
+        batch_types = np.concatenate(
+            [np.full(len(salaries), "income", dtype=object), type_names[types]]
+        )[order]
+
+        if len(batch_days):
+            yield list(
+                zip(
+                    day_names[batch_days].tolist(),
+                    batch_descriptions.tolist(),
+                    batch_categories.tolist(),
+                    batch_amounts.tolist(),
+                    batch_types.tolist(),
+                )
+            )
+        first_day = end_day
 
 
 def generate_seed_data(
-    start_date_str: str, end_date_str: str, num_rows: int, categories: List[str]
+    start_date_str: str,
+    end_date_str: str,
+    num_rows: int,
+    categories: List[str],
+    seed: Optional[int] = None,
 ) -> List[Dict[str, Union[str, float]]]:
     """
     Generates seed data for budget tracker transactions.
@@ -16,161 +250,204 @@ def generate_seed_data(
         end_date_str: End date for the range (YYYY-MM-DD).
         num_rows: Number of transaction rows to generate.
         categories: List of possible transaction categories.
+        seed: Seed for the random numbers, or None for different data each time.
 
     Returns:
-        A list of transaction dictionaries.
+        A list of transaction dictionaries, in date order.
     """
-    start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-    end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-    time_difference = end_date - start_date
-    transactions: List[Dict[str, Union[str, float]]] = []
-    salary_counts_per_month: Dict[str, int] = defaultdict(int)
-    salary_category = "Salary"
-
-    income_keywords = ["salary", "deposit", "freelance", "investment", "bonus", "gift"]
-    expense_keywords = [
-        "grocery",
-        "rent",
-        "bill",
-        "shopping",
-        "food",
-        "entertainment",
-        "transport",
-        "payment",
-        "subscription",
+    return [
+        {
+            "date": day,
+            "description": description,
+            "category": category,
+            "amount": amount / 100,
+            "type": transaction_type,
+        }
+        for batch in generate_seed_batches(
+            start_date_str, end_date_str, num_rows, categories, seed
+        )
+        for day, description, category, amount, transaction_type in batch
     ]
 
-    # Generate forced salary transactions
-    current_date = start_date
-    while current_date <= end_date:
-        year_month = current_date.strftime("%Y-%m")
-        # Ensure 2 salary transactions per month
-        for _ in range(2 - salary_counts_per_month[year_month]):
-            first_day_of_next_month: date
-            if current_date.month == 12:
-                first_day_of_next_month = current_date.replace(
-                    day=1, month=1, year=current_date.year + 1
-                )
-            else:
-                first_day_of_next_month = current_date.replace(
-                    day=1, month=current_date.month + 1, year=current_date.year
-                )
 
-            last_day_of_current_month = first_day_of_next_month - timedelta(days=1)
-            day_of_month = random.randint(1, last_day_of_current_month.day)
-            salary_date = current_date.replace(day=day_of_month)
-            date_str = salary_date.strftime("%Y-%m-%d")
-            amount = round(random.uniform(1500, 5000), 2)
-            description = f"Salary Deposit"
-            transactions.append(
-                {
-                    "date": date_str,
-                    "description": description,
-                    "category": salary_category,
-                    "amount": amount,
-                    "type": "income",
-                }
-            )
-            salary_counts_per_month[year_month] += 1
-        current_date += timedelta(days=32)
-        current_date = current_date.replace(day=1)
-
-    for _ in range(num_rows - len(transactions)):
-        # Randomly select a date within the range
-        random_days = random.randint(0, time_difference.days)
-        transaction_date = start_date + timedelta(days=random_days)
-        date_str = transaction_date.strftime("%Y-%m-%d")
-        year_month = transaction_date.strftime("%Y-%m")
-
-        # Ensure we don't exceed 2 salaries per month unintentionally
-        if salary_counts_per_month[year_month] >= 2:
-            category = random.choice(
-                [cat for cat in categories if cat != salary_category]
-            )
-        else:
-            category = random.choice(categories)
+def write_sqlite(path: str, batches: Iterable[List[Row]]) -> int:
+    """
+    Adds the rows to the SQLite database at path, creating it if needed, as
+    a bulk import. Returns the number of rows added, or -1 on failure.
+    """
+    previous_path = os.environ.get(DB_PATH_VARIABLE)
+    os.environ[DB_PATH_VARIABLE] = os.path.abspath(path)
+    from db import db
 
-        # Determine transaction type based on category (simple heuristic)
-        if any(keyword in category.lower() for keyword in income_keywords):
-            transaction_type = "income"
-        elif any(keyword in category.lower() for keyword in expense_keywords):
-            transaction_type = "expense"
-        else:
-            transaction_type = random.choice(["income", "expense"])
-
-        # Generate a description
-        description_parts = [
-            (
-                random.choice(income_keywords)
-                if transaction_type == "income"
-                else random.choice(expense_keywords)
-            )
-        ]
-        if random.random() < 0.6:
-            description_parts.append(
-                random.choice(["", " payment", " purchase", " deposit", " fee"])
-            )
-        description = (
-            category.capitalize()
-            + " "
-            + "".join(description_parts).capitalize().strip()
+    try:
+        if not db.create_transactions_table():
+            return -1
+        # Imported in the batches already made, rather than re-chunked.
+        return db.import_transactions(
+            itertools.chain.from_iterable(batches), DEFAULT_BATCH_SIZE
         )
-
-        # Generate a realistic amount
-        if transaction_type == "income":
-            if category == "Salary":
-                amount = round(random.uniform(3000, 5000), 2)
-            else:
-                amount = round(random.uniform(50, 1000), 2)
+    finally:
+        db.close_writer()
+        db.close_pool()
+        if previous_path is None:
+            del os.environ[DB_PATH_VARIABLE]
         else:
-            amount = round(random.uniform(1, 1500), 2)
-
-        transactions.append(
-            {
-                "date": date_str,
-                "description": description,
-                "category": category,
-                "amount": amount,
-                "type": transaction_type,
-            }
+            os.environ[DB_PATH_VARIABLE] = previous_path
+
+
+def _json_lines(batches: Iterable[List[Row]]) -> Iterator[str]:
+    """Yields each row as a JSON object."""
+    # Descriptions and categories repeat, so each is only encoded once.
+    quote = functools.lru_cache(maxsize=None)(json.dumps)
+    for batch in batches:
+        yield from (
+            f'{{"date": "{day}", "description": {quote(description)}, '
+            f'"category": {quote(category)}, "amount": {amount / 100}, '
+            f'"type": "{transaction_type}"}}'
+            for day, description, category, amount, transaction_type in batch
         )
-        if category == salary_category:
-            salary_counts_per_month[year_month] += 1
 
-    return transactions
 
+def write_json_lines(path: str, batches: Iterable[List[Row]]) -> int:
+    """Writes the rows to a JSON-lines file. Returns the number written."""
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for line in _json_lines(batches):
+            f.write(line + "\n")
+            written += 1
+    return written
 
-if __name__ == "__main__":
-    start_date = "2024-01-01"
-    end_date = "2025-04-30"
-    num_transactions = 500
-    possible_categories = [
-        "Salary",
-        "Rent",
-        "Groceries",
-        "Utilities",
-        "Entertainment",
-        "Transportation",
-        "Freelance Income",
-        "Food",
-        "Shopping",
-        "Investment Income",
-        "Health",
-        "Education",
-        "Gifts",
-        "Travel",
-        "Bonus",
-        "Other Income",
-        "Other Expense",
-    ]
 
-    seed_data = generate_seed_data(
-        start_date, end_date, num_transactions, possible_categories
+def write_json(path: str, batches: Iterable[List[Row]]) -> int:
+    """
+    Writes the rows as a JSON array, as seed() reads it. Returns the number
+    written.
+    """
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for line in _json_lines(batches):
+            f.write(f"{',' if written else ''}\n  {line}")
+            written += 1
+        f.write("\n]\n")
+    return written
+
+
+def write_csv(path: str, batches: Iterable[List[Row]]) -> int:
+    """
+    Writes the rows to a CSV file with a header, as the import command reads
+    it. Returns the number written.
+    """
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "description", "category", "amount", "type"])
+        for batch in batches:
+            writer.writerows(
+                (day, description, category, f"{amount / 100:.2f}", kind)
+                for day, description, category, amount, kind in batch
+            )
+            written += len(batch)
+    return written
+
+
+WRITERS: Dict[str, Callable[[str, Iterable[List[Row]]], int]] = {
+    "sqlite": write_sqlite,
+    "jsonl": write_json_lines,
+    "csv": write_csv,
+    "json": write_json,
+}
+
+
+def output_format(path: str) -> str:
+    """Returns the output format that a file name's extension implies."""
+    if path.endswith(SQLITE_EXTENSIONS):
+        return "sqlite"
+    if path.endswith(".jsonl"):
+        return "jsonl"
+    if path.endswith(".csv"):
+        return "csv"
+    return "json"
+
+
+def main() -> None:
+    """Generates seed data as the command-line arguments ask."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "-n",
+        "--rows",
+        type=int,
+        default=DEFAULT_ROWS,
+        help=f"The number of transactions to generate, default is {DEFAULT_ROWS}",
     )
+    parser.add_argument(
+        "-s",
+        "--start-date",
+        default=DEFAULT_START_DATE,
+        help=f"The first date, YYYY-MM-DD, default is {DEFAULT_START_DATE}",
+    )
+    parser.add_argument(
+        "-e",
+        "--end-date",
+        default=DEFAULT_END_DATE,
+        help=f"The last date, YYYY-MM-DD, default is {DEFAULT_END_DATE}",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="seed_data.json",
+        help="The file to write, default is seed_data.json",
+    )
+    parser.add_argument(
+        "-fmt",
+        "--format",
+        choices=OUTPUT_FORMATS,
+        help="The output format, by default taken from the file's extension",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=DEFAULT_SEED,
+        help=f"The random seed, default is {DEFAULT_SEED}",
+    )
+    parser.add_argument(
+        "-bs",
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Rows generated at a time, default is {DEFAULT_BATCH_SIZE}",
+    )
+    args = parser.parse_args()
 
-    sorted_seed_data = sorted(seed_data, key=lambda item: item["date"])
+    file_format = args.format or output_format(args.output)
+    start_time = time.perf_counter()
+    try:
+        batches = generate_seed_batches(
+            args.start_date,
+            args.end_date,
+            args.rows,
+            DEFAULT_CATEGORIES,
+            args.seed,
+            args.batch_size,
+        )
+        written = WRITERS[file_format](args.output, batches)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    except OSError as e:
+        print(f"Error writing {args.output}: {e}")
+        return
+    elapsed = time.perf_counter() - start_time
 
-    with open("seed_data.json", "w") as f:
-        json.dump(sorted_seed_data, f, indent=2)
+    if written < 0:
+        print(f"Error: No seed data was added to {args.output}.")
+        return
+    rate = written / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{written:,} rows of seed data generated and saved to {args.output} "
+        f"in {elapsed:.2f}s ({rate:,.0f} rows/sec)"
+    )
 
-    print(f"{len(seed_data)} rows of seed data generated and saved to seed_data.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Holds the query and request metrics for the Budget Tracker, and renders them
+in the Prometheus text format.
+
+Statements are timed by instrumented connection and cursor classes, which
+the pool and writer only use while metrics are enabled: with metrics off,
+connections are plain sqlite3 ones and nothing is recorded. Each statement
+is labelled by a fingerprint of its SQL (with whitespace and literal values
+normalised), so the labels stay few however the values vary.
+"""
+
+import bisect
+import collections
+import functools
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, Optional, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+REQUEST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Longer SQL is cut short in the query info metric.
+MAX_SQL_LENGTH = 200
+METRIC_PREFIX = "budget"
+# The statistics (see db.get_stats) that only ever go up; the rest are gauges.
+STATS_COUNTERS = (
+    "hits",
+    "misses",
+    "evictions",
+    "invalidations",
+    "commits",
+    "jobs",
+    "opened",
+    "acquired",
+)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> Tuple[str, str]:
+    """
+    Returns the fingerprint of a SQL statement (a short hash) and the
+    normalised SQL it was taken from: whitespace collapsed and string and
+    number literals replaced with ?.
+    """
+    normalised = _LITERALS.sub("?", _WHITESPACE.sub(" ", sql).strip())
+    digest = hashlib.blake2b(normalised.encode("utf-8"), digest_size=6).hexdigest()
+    return digest, normalised
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, with their sum."""
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class QueryStats:
+    """The execution times, errors and rows returned of one statement."""
+
+    def __init__(self, sql: str) -> None:
+        self.sql = sql
+        self.duration = Histogram(QUERY_BUCKETS)
+        self.errors = 0
+        self.rows = 0
+
+
+class Metrics:
+    """
+    The metrics recorded in this process: per-statement query statistics
+    and per-route request latencies. Safe to use from any thread.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._queries: dict[str, QueryStats] = {}
+        self._requests: dict[Tuple[str, str, str], Histogram] = {}
+        # Rows counted by defer_rows, recorded the next time the lock is held.
+        self._deferred_rows: collections.deque[Tuple[str, int]] = collections.deque()
+
+    def _query(self, sql: str) -> QueryStats:
+        """Returns the statistics of a statement. Call with the lock held."""
+        key, normalised = fingerprint(sql)
+        stats = self._queries.get(key)
+        if stats is None:
+            stats = self._queries[key] = QueryStats(normalised)
+        return stats
+
+    def observe_query(self, sql: str, seconds: float, failed: bool = False) -> None:
+        """Records one execution of a statement."""
+        with self._lock:
+            stats = self._query(sql)
+            stats.duration.observe(seconds)
+            if failed:
+                stats.errors += 1
+
+    def _record_deferred_rows(self) -> None:
+        """Records the rows queued by defer_rows. Call with the lock held."""
+        while True:
+            try:
+                sql, rows = self._deferred_rows.popleft()
+            except IndexError:
+                return
+            self._query(sql).rows += rows
+
+    def count_rows(self, sql: str, rows: int) -> None:
+        """Records rows fetched from a statement's result."""
+        with self._lock:
+            self._query(sql).rows += rows
+
+    def defer_rows(self, sql: str, rows: int) -> None:
+        """
+        Queues rows fetched from a statement's result to be recorded later,
+        without taking the lock. For finalizers: a garbage collection can run
+        one on a thread that already holds the lock.
+        """
+        self._deferred_rows.append((sql, rows))
+
+    def observe_request(
+        self, method: str, route: str, status: int, seconds: float
+    ) -> None:
+        """Records the latency of one API request."""
+        key = (method, route, str(status))
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram(REQUEST_BUCKETS)
+            histogram.observe(seconds)
+
+    def clear(self) -> None:
+        """Forgets everything recorded so far."""
+        with self._lock:
+            self._deferred_rows.clear()
+            self._queries.clear()
+            self._requests.clear()
+
+    def render(self, stats: Optional[dict[str, Any]] = None) -> str:
+        """
+        Returns the metrics in the Prometheus text format, along with the
+        result cache, writer and pool statistics in stats (see get_stats).
+        """
+        lines: list[str] = []
+        with self._lock:
+            self._record_deferred_rows()
+            queries = sorted(self._queries.items())
+            _write_metric(
+                lines,
+                "db_query_info",
+                "gauge",
+                "The normalised SQL of each query fingerprint.",
+                (
+                    ({"query": key, "sql": q.sql[:MAX_SQL_LENGTH]}, 1)
+                    for key, q in queries
+                ),
+            )
+            _write_histogram(
+                lines,
+                "db_query_duration_seconds",
+                "Time taken to execute each statement.",
+                [({"query": key}, q.duration) for key, q in queries],
+            )
+            _write_metric(
+                lines,
+                "db_query_errors_total",
+                "counter",
+                "Statements that failed.",
+                (({"query": key}, q.errors) for key, q in queries),
+            )
+            _write_metric(
+                lines,
+                "db_rows_returned_total",
+                "counter",
+                "Rows fetched from the results of each statement.",
+                (({"query": key}, q.rows) for key, q in queries),
+            )
+            _write_histogram(
+                lines,
+                "http_request_duration_seconds",
+                "Time taken to start the response to each API request.",
+                [
+                    ({"method": method, "route": route, "status": status}, histogram)
+                    for (method, route, status), histogram in sorted(
+                        self._requests.items()
+                    )
+                ],
+            )
+
+        for section, values in sorted((stats or {}).items()):
+            for name, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                if name in STATS_COUNTERS:
+                    _write_metric(
+                        lines,
+                        f"{section}_{name}_total",
+                        "counter",
+                        f"The {section} {name} count.",
+                        [({}, value)],
+                    )
+                else:
+                    _write_metric(
+                        lines,
+                        f"{section}_{name}",
+                        "gauge",
+                        f"The {section} {name} value.",
+                        [({}, value)],
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    """Escapes a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str]) -> str:
+    """Formats labels as {name="value",...}, or nothing if there are none."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _write_metric(
+    lines: list[str],
+    name: str,
+    kind: str,
+    description: str,
+    samples: Iterable[Tuple[dict[str, str], float]],
+) -> None:
+    """Appends a metric's HELP and TYPE lines and its samples to lines."""
+    name = f"{METRIC_PREFIX}_{name}"
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+
+def _write_histogram(
+    lines: list[str],
+    name: str,
+    description: str,
+    samples: list[Tuple[dict[str, str], Histogram]],
+) -> None:
+    """Appends a histogram's HELP and TYPE lines and its buckets to lines."""
+    name = f"{METRIC_PREFIX}_{name}"
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in samples:
+        cumulative = 0
+        bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, histogram.counts):
+            cumulative += count
+            bucket_labels = _labels({**labels, "le": bound})
+            lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Returns the metrics recorded in this process."""
+    return _metrics
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    A cursor that records the time each statement takes to execute and the
+    rows fetched from it. Rows are counted on the cursor and recorded once
+    the statement's rows are exhausted, it is executed again or the cursor
+    is closed (or collected), to keep the cost per row down.
+    """
+
+    _sql = ""
+    _rows = 0
+
+    def _record_rows(self) -> None:
+        if self._rows:
+            _metrics.count_rows(self._sql, self._rows)
+            self._rows = 0
+
+    def execute(self, sql: str, parameters: Any = (), /) -> "InstrumentedCursor":
+        self._record_rows()
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except sqlite3.Error:
+            _metrics.observe_query(sql, time.perf_counter() - start, failed=True)
+            raise
+        _metrics.observe_query(sql, time.perf_counter() - start)
+        return self
+
+    def executemany(
+        self, sql: str, seq_of_parameters: Iterable[Any], /
+    ) -> "InstrumentedCursor":
+        self._record_rows()
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error:
+            _metrics.observe_query(sql, time.perf_counter() - start, failed=True)
+            raise
+        _metrics.observe_query(sql, time.perf_counter() - start)
+        return self
+
+    def fetchone(self) -> Any:
+        row = super().fetchone()
+        if row is None:
+            self._record_rows()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> list[Any]:
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._rows += len(rows)
+        if not rows:
+            self._record_rows()
+        return rows
+
+    def fetchall(self) -> list[Any]:
+        rows = super().fetchall()
+        self._rows += len(rows)
+        self._record_rows()
+        return rows
+
+    def __next__(self) -> Any:
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._record_rows()
+            raise
+        self._rows += 1
+        return row
+
+    def close(self) -> None:
+        self._record_rows()
+        super().close()
+
+    def __del__(self) -> None:
+        # Rows of a result that was neither exhausted nor closed. Deferred, as
+        # the lock may be held by the code this finalizer interrupted.
+        if self._rows:
+            _metrics.defer_rows(self._sql, self._rows)
+            self._rows = 0
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A connection whose cursors, and execute shortcuts, are instrumented."""
+
+    def cursor(self, factory: Any = InstrumentedCursor) -> Any:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = (), /) -> Any:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any], /) -> Any:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory(enabled: bool) -> type[sqlite3.Connection]:
+    """Returns the connection class to open connections with."""
+    return InstrumentedConnection if enabled else sqlite3.Connection
@@ -0,0 +1,217 @@
+"""
+Holds the versioned schema migrations for the Budget Tracker database.
+
+The schema version is kept in PRAGMA user_version. Each migration moves
+the database up one version and is written so that it can be interrupted
+and run again: long-running copies are done in chunks that each commit on
+their own and resume from where the last one stopped, and the final switch
+to the new schema happens in a single transaction along with the version
+bump. Migrations run their steps as jobs on the database writer.
+"""
+
+import sqlite3
+from typing import Any, Callable, Optional
+
+from cli.models import to_cents
+
+# The schema version that a new database is created at.
+SCHEMA_VERSION: int = 2
+DEFAULT_MIGRATION_CHUNK_SIZE: int = 50000
+
+# Runs a job on the writer's connection and commits it (see db.db.write).
+Write = Callable[[Callable[[sqlite3.Connection], Any]], Any]
+
+SELECT_TRANSACTIONS_TABLE = (
+    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"
+)
+SELECT_SEQUENCE = "SELECT seq FROM sqlite_sequence WHERE name = ?"
+RESTORE_TRANSACTIONS_SEQUENCE = (
+    "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'transactions'"
+)
+
+# Version 1: amounts stored as INTEGER cents instead of REAL.
+CREATE_CENTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS transactions_cents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        description TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount INTEGER NOT NULL,
+        type TEXT NOT NULL CHECK(type IN ('income', 'expense'))
+    )
+    """
+COPY_CENTS_CHUNK = """
+    INSERT INTO transactions_cents (id, date, description, category, amount, type)
+    SELECT id, date, description, category, to_cents(amount), type
+    FROM transactions
+    WHERE id > (SELECT COALESCE(MAX(id), 0) FROM transactions_cents)
+    ORDER BY id
+    LIMIT ?
+    """
+
+# Version 2: categories moved to their own table and referenced by id.
+CREATE_CATEGORIES_TABLE = """
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    """
+CREATE_CATEGORY_IDS_TABLE = """
+    CREATE TABLE IF NOT EXISTS transactions_category_ids (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        description TEXT NOT NULL,
+        category_id INTEGER NOT NULL REFERENCES categories (id),
+        amount INTEGER NOT NULL,
+        type TEXT NOT NULL CHECK(type IN ('income', 'expense'))
+    )
+    """
+# Adds the categories of the rows the next COPY_CATEGORY_IDS_CHUNK will copy.
+INSERT_CHUNK_CATEGORIES = """
+    INSERT OR IGNORE INTO categories (name)
+    SELECT DISTINCT category FROM (
+        SELECT category
+        FROM transactions
+        WHERE id > (SELECT COALESCE(MAX(id), 0) FROM transactions_category_ids)
+        ORDER BY id
+        LIMIT ?
+    )
+    ORDER BY category
+    """
+COPY_CATEGORY_IDS_CHUNK = """
+    INSERT INTO transactions_category_ids
+        (id, date, description, category_id, amount, type)
+    SELECT t.id, t.date, t.description, c.id, t.amount, t.type
+    FROM transactions t
+    JOIN categories c ON c.name = t.category
+    WHERE t.id > (SELECT COALESCE(MAX(id), 0) FROM transactions_category_ids)
+    ORDER BY t.id
+    LIMIT ?
+    """
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Returns the schema version recorded in the database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_schema_version(conn: sqlite3.Connection, version: int) -> None:
+    """Records the schema version in the database."""
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def _copy_in_chunks(
+    write: Write,
+    copy_chunk: Callable[[sqlite3.Connection, int], int],
+    chunk_size: int,
+    progress: str,
+) -> None:
+    """
+    Runs copy_chunk(conn, chunk_size) as its own write until it copies no
+    more rows, printing the running total with the progress message.
+    """
+    copied = 0
+    while rows := write(lambda conn: copy_chunk(conn, chunk_size)):
+        copied += rows
+        print(f"{progress.format(copied)}...")
+
+
+def _swap_transactions_table(
+    conn: sqlite3.Connection,
+    new_table: str,
+    copy_chunk: Callable[[sqlite3.Connection, int], int],
+    version: int,
+) -> None:
+    """
+    Copies the rows added since the last chunk, replaces transactions with
+    new_table and records the new schema version, all in one transaction.
+    The monthly_totals rollup is dropped so it is rebuilt on the new table.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    # LIMIT -1 is no limit.
+    copy_chunk(conn, -1)
+    row = conn.execute(SELECT_SEQUENCE, ("transactions",)).fetchone()
+    last_id: int = row[0] if row else 0
+    conn.execute("DROP TABLE transactions")
+    conn.execute(f"ALTER TABLE {new_table} RENAME TO transactions")
+    # Keep AUTOINCREMENT from reusing the ids of deleted transactions.
+    conn.execute(RESTORE_TRANSACTIONS_SEQUENCE, (last_id,))
+    conn.execute("DROP TABLE IF EXISTS monthly_totals")
+    set_schema_version(conn, version)
+
+
+def _migrate_amounts_to_cents(write: Write, chunk_size: int) -> None:
+    """
+    Version 1: copies the transactions into a table with INTEGER cent
+    amounts, chunk_size rows per commit, then swaps it in for the old table.
+    """
+
+    def copy_chunk(conn: sqlite3.Connection, limit: int) -> int:
+        # Convert with the same rounding as amounts saved by the application.
+        conn.create_function("to_cents", 1, to_cents, deterministic=True)
+        return conn.execute(COPY_CENTS_CHUNK, (limit,)).rowcount
+
+    write(lambda conn: conn.execute(CREATE_CENTS_TABLE))
+    _copy_in_chunks(
+        write, copy_chunk, chunk_size, "Converted {:,} transactions to integer cents"
+    )
+    write(
+        lambda conn: _swap_transactions_table(
+            conn, "transactions_cents", copy_chunk, 1
+        )
+    )
+
+
+def _migrate_categories_to_ids(write: Write, chunk_size: int) -> None:
+    """
+    Version 2: adds each distinct category to the categories table and
+    copies the transactions into a table that references it by id,
+    chunk_size rows per commit, then swaps it in for the old table.
+    """
+
+    def copy_chunk(conn: sqlite3.Connection, limit: int) -> int:
+        conn.execute(INSERT_CHUNK_CATEGORIES, (limit,))
+        return conn.execute(COPY_CATEGORY_IDS_CHUNK, (limit,)).rowcount
+
+    def create_tables(conn: sqlite3.Connection) -> None:
+        conn.execute(CREATE_CATEGORIES_TABLE)
+        conn.execute(CREATE_CATEGORY_IDS_TABLE)
+
+    write(create_tables)
+    _copy_in_chunks(
+        write, copy_chunk, chunk_size, "Moved {:,} transactions to category ids"
+    )
+    write(
+        lambda conn: _swap_transactions_table(
+            conn, "transactions_category_ids", copy_chunk, 2
+        )
+    )
+
+
+# Maps each schema version to the migration that upgrades a database to it.
+MIGRATIONS: dict[int, Callable[[Write, int], None]] = {
+    1: _migrate_amounts_to_cents,
+    2: _migrate_categories_to_ids,
+}
+
+
+def migrate(
+    write: Write,
+    chunk_size: int = DEFAULT_MIGRATION_CHUNK_SIZE,
+    target_version: Optional[int] = None,
+) -> int:
+    """
+    Upgrades an existing database to target_version (by default the latest)
+    and returns the version it ends up at. A database without a transactions
+    table is left alone, as it is created at the latest version. Raises
+    sqlite3.Error if a migration fails; running it again resumes it.
+    """
+    target = SCHEMA_VERSION if target_version is None else target_version
+    version: int = write(get_schema_version)
+    if not write(lambda conn: conn.execute(SELECT_TRANSACTIONS_TABLE).fetchone()):
+        return version
+    while version < target:
+        version += 1
+        print(f"Migrating the database to schema version {version}...")
+        MIGRATIONS[version](write, chunk_size)
+    return version
@@ -0,0 +1,195 @@
+"""Holds the SQLite connection pool used by the database functions."""
+
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+DEFAULT_POOL_SIZE: int = 5
+DEFAULT_POOL_TIMEOUT: float = 30.0
+# Connections kept apart for streamed exports, which hold one for as long as
+# the client takes to download.
+DEFAULT_STREAM_POOL_SIZE: int = 2
+HEALTH_CHECK_QUERY = "SELECT 1"
+
+
+class PoolClosedError(sqlite3.Error):
+    """Raised when a connection is requested from a closed pool."""
+
+
+class PoolTimeoutError(TimeoutError):
+    """
+    Raised when no connection becomes available within the timeout. Not a
+    sqlite3.Error, so that readers which handle database errors let it
+    through to be reported as the server being busy.
+    """
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool of long-lived SQLite connections.
+
+    Connections are created lazily up to `size`, handed to one thread at a
+    time and health-checked before being lent out again. A connection that
+    fails the check is discarded and replaced.
+    """
+
+    def __init__(
+        self,
+        database_path: str,
+        size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_POOL_TIMEOUT,
+        pragmas: Optional[dict[str, Any]] = None,
+        factory: type[sqlite3.Connection] = sqlite3.Connection,
+    ) -> None:
+        if size < 1:
+            raise ValueError(f"Invalid pool size: {size}")
+        self.database_path = database_path
+        self.pragmas = pragmas or {}
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._opened = 0
+        self._acquired = 0
+        self._closed = False
+        self._owners: dict[int, int] = {}
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """
+        Opens a new connection (of the factory class) that may be passed
+        between threads and applies the configured pragmas to it.
+        """
+        conn = sqlite3.connect(
+            self.database_path, check_same_thread=False, factory=self.factory
+        )
+        try:
+            for pragma, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {pragma} = {value}")
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        """Returns True if the connection can still execute a query."""
+        try:
+            conn.execute(HEALTH_CHECK_QUERY).fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """Closes a connection and frees its slot in the pool."""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Borrows a connection from the pool, opening a new one if the pool
+        has not reached its size yet. Blocks for up to `timeout` seconds
+        when every connection is in use.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self._closed:
+                raise PoolClosedError("Connection pool is closed.")
+
+            conn: Optional[sqlite3.Connection] = None
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        conn = self._create_connection()
+                    except sqlite3.Error:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                    with self._lock:
+                        self._opened += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No connection available after {self.timeout}s."
+                        )
+                    try:
+                        # Wake up periodically in case a discarded connection
+                        # freed a slot instead of returning to the queue.
+                        conn = self._idle.get(timeout=min(remaining, 0.1))
+                    except queue.Empty:
+                        continue
+
+            if not self._is_healthy(conn):
+                self._discard(conn)
+                continue
+
+            with self._lock:
+                self._owners[id(conn)] = threading.get_ident()
+                self._acquired += 1
+            return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """
+        Returns a borrowed connection to the pool. Any transaction left open
+        by the borrower is rolled back so the next borrower starts clean.
+        """
+        with self._lock:
+            if self._owners.pop(id(conn), None) is None:
+                # Not lent out by this pool (or already released).
+                return
+
+        if self._closed:
+            self._discard(conn)
+            return
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        """Closes every idle connection; borrowed ones close on release."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the pool has been shut down."""
+        return self._closed
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the number of open, idle and borrowed connections, along with
+        the connections opened and lent out so far.
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "idle": self._idle.qsize(),
+                "in_use": len(self._owners),
+                "opened": self._opened,
+                "acquired": self._acquired,
+            }
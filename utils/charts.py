@@ -0,0 +1,53 @@
+"""
+Holds the chart drawing for the Budget Tracker.
+
+Images are rendered on a matplotlib Figure that isn't attached to pyplot,
+so rendering needs no display, keeps no global state and can run in a
+worker process. matplotlib is imported only when a chart is drawn, as it is
+slow to import.
+"""
+
+from io import BytesIO
+from typing import Any, Optional
+
+# The image formats a chart can be rendered to, and their media types.
+CHART_FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+FIGURE_SIZE = (10, 6)
+
+
+def expenses_chart_title(month: Optional[str] = None) -> str:
+    """Returns the title of the expenses chart for a month (YYYY-MM) or overall."""
+    return f"Expenses by Category {'for ' + month if month else 'Overall'}"
+
+
+def draw_category_chart(
+    axes: Any, totals_by_category: dict[str, float], title: str
+) -> None:
+    """Draws a bar graph of spending per category on matplotlib axes."""
+    categories = list(totals_by_category.keys())
+    axes.bar(categories, list(totals_by_category.values()), color="skyblue")
+    axes.set_xlabel("Expense Category")
+    axes.set_ylabel("Total Spending")
+    axes.set_title(title)
+    axes.set_xticks(range(len(categories)), categories, rotation=45, ha="right")
+
+
+def render_category_chart(
+    totals_by_category: dict[str, float], title: str, image_format: str = "png"
+) -> bytes:
+    """
+    Renders a bar graph of spending per category to a PNG or SVG image.
+    Raises ValueError for any other format.
+    """
+    if image_format not in CHART_FORMATS:
+        raise ValueError(f"Invalid chart format: {image_format}")
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=FIGURE_SIZE)
+    draw_category_chart(figure.subplots(), totals_by_category, title)
+    figure.tight_layout()
+    buffer = BytesIO()
+    # Without a date in the metadata, the same data renders to the same SVG.
+    metadata = {"Date": None} if image_format == "svg" else None
+    figure.savefig(buffer, format=image_format, metadata=metadata)
+    return buffer.getvalue()
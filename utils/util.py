@@ -1,7 +1,19 @@
 import calendar
 import csv
+import json
+import math
+from datetime import date
+from io import StringIO
+from typing import Any, Iterable, Iterator, Optional, TextIO, Tuple
 
-from api.models import TransactionResponse
+from cli.models import TransactionType, from_cents, to_cents
+
+CSV_FILENAME = "transactions.csv"
+# The fields of api.models.TransactionResponse, spelled out so that the CLI
+# doesn't import pydantic to write a CSV file.
+CSV_COLUMNS = ["date", "description", "category", "amount", "type", "id"]
+CSV_CHUNK_ROWS = 1000
+TRANSACTION_TYPES = frozenset(str(transaction_type) for transaction_type in TransactionType)
 
 
 def get_start_end_date_from_month(date: str):
@@ -14,13 +26,119 @@ def get_start_end_date_from_month(date: str):
     return start_date, end_date
 
 
-def write_to_csv(filename: str, transactions: list[TransactionResponse]):
+def get_date_range(year: str, month: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Returns the half-open [start, end) ISO date range covering a whole year,
+    or a single month of that year, for index-friendly date comparisons.
+    """
+    year_int = int(year)
+    if month is None:
+        return f"{year_int:04d}-01-01", f"{year_int + 1:04d}-01-01"
+    month_int = int(month)
+    if not 1 <= month_int <= 12:
+        raise ValueError(f"Invalid month: {month}")
+    start_date = f"{year_int:04d}-{month_int:02d}-01"
+    if month_int == 12:
+        end_date = f"{year_int + 1:04d}-01-01"
+    else:
+        end_date = f"{year_int:04d}-{month_int + 1:02d}-01"
+    return start_date, end_date
+
+
+def iter_csv(
+    transactions: Iterable[Tuple[Any, ...]], chunk_rows: int = CSV_CHUNK_ROWS
+) -> Iterator[str]:
+    """
+    Formats transaction rows (id, date, description, category, amount, type),
+    such as a database cursor or a TransactionBatch, as CSV with the amount
+    in currency units, yielding the header and then chunk_rows rows per string.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    rows_in_buffer = 0
+    for transaction in transactions:
+        # CSV columns follow TransactionResponse, which puts the id last.
+        transaction_id, day, description, category, amount, kind = transaction
+        writer.writerow(
+            (day, description, category, from_cents(amount), kind, transaction_id)
+        )
+        rows_in_buffer += 1
+        if rows_in_buffer >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows_in_buffer = 0
+    yield buffer.getvalue()
+
+
+def write_to_csv(filename: str, transactions: Iterable[Tuple[Any, ...]]) -> bool:
     try:
         with open(filename, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(TransactionResponse.model_fields.keys())
-            for transaction in transactions:
-                writer.writerow(transaction.model_dump().values())
+            for chunk in iter_csv(transactions):
+                csvfile.write(chunk)
             print(f"Transactions exported to {filename} successfully!")
+        return True
     except Exception as e:
         print(f"Error exporting to CSV: {e}")
+        return False
+
+
+def iter_import_records(
+    file: TextIO, file_format: str
+) -> Iterator[Tuple[int, dict[str, Any] | str]]:
+    """
+    Yields (line number, record) pairs from a CSV file in the export-csv
+    format, as dicts, or from a JSON-lines file, as undecoded lines so that a
+    malformed line can be reported without stopping the import.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+    elif file_format == "jsonl":
+        for line_number, line in enumerate(file, start=1):
+            if line.strip():
+                yield line_number, line
+    else:
+        raise ValueError(f"Invalid import format: {file_format}")
+
+
+def parse_transaction_record(
+    record: dict[str, Any] | str,
+) -> Tuple[str, str, str, int, str]:
+    """
+    Validates an imported transaction record (a dict or a JSON object string)
+    and returns it as a (date, description, category, amount, type) row, with
+    the amount in cents.
+    Raises ValueError if the record or one of its fields is invalid.
+    """
+    if isinstance(record, str):
+        record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError("expected a JSON object")
+    try:
+        transaction_date = str(record["date"])
+        parsed_date = date.fromisoformat(transaction_date)
+        if len(transaction_date) != 10:
+            # Normalise other ISO forms (e.g. YYYYMMDD) to YYYY-MM-DD.
+            transaction_date = parsed_date.isoformat()
+        description = str(record["description"])
+        category = str(record["category"])
+        amount = float(record["amount"])
+        transaction_type = str(record["type"]).lower()
+    except KeyError as e:
+        raise ValueError(f"missing field {e}")
+    if transaction_type not in TRANSACTION_TYPES:
+        raise ValueError(f"invalid type '{transaction_type}'")
+    if not category:
+        raise ValueError("category must not be empty")
+    if not math.isfinite(amount):
+        raise ValueError(f"invalid amount {amount}")
+    return (
+        transaction_date,
+        description,
+        category,
+        to_cents(amount),
+        transaction_type,
+    )